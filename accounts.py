@@ -0,0 +1,139 @@
+import hashlib
+import threading
+from send_pipeline import RateLimiter
+from clock import SYSTEM_CLOCK
+
+
+class SenderAccount:
+    """One Gmail mailbox used for sending: credentials, quota and health."""
+
+    def __init__(self, user, password, per_minute=20, per_day=500, governor=None, clock=None):
+        self.user = user
+        self.password = password
+        self.clock = clock or SYSTEM_CLOCK
+        self.rate_limiter = RateLimiter(per_minute=per_minute, per_day=per_day, governor=governor,
+                                        clock=self.clock)
+        self.watcher = None          # IMAPWatcher, created when the campaign starts
+        self.locked = False          # login rejected; skipped until revalidated
+        self.throttled_until = 0.0   # Gmail asked us to slow down
+        self.failures = 0
+        self.last_error = ""
+        self.sent = 0
+        self._lock = threading.Lock()
+
+    def healthy(self, now=None):
+        return not self.locked and (now or self.clock.time()) >= self.throttled_until
+
+    def mark_success(self):
+        with self._lock:
+            self.failures = 0
+            self.sent += 1
+
+    def mark_throttled(self, error="", base=60, cap=3600):
+        """Bench the account; repeated throttling doubles the pause up to ``cap`` seconds."""
+        with self._lock:
+            self.failures += 1
+            seconds = min(cap, base * 2 ** (self.failures - 1))
+            self.throttled_until = max(self.throttled_until, self.clock.time() + seconds)
+            self.last_error = str(error)
+
+    def mark_error(self, error=""):
+        with self._lock:
+            self.last_error = str(error)
+
+    def mark_locked(self, error=""):
+        with self._lock:
+            self.failures += 1
+            self.locked = True
+            self.last_error = str(error)
+
+    def status(self):
+        usage = self.rate_limiter.usage()
+        if self.locked:
+            state = "locked"
+        elif not self.healthy():
+            state = "throttled"
+        else:
+            state = "ok"
+        return {"user": self.user, "state": state, "sent": self.sent,
+                "sent_24h": usage["sent_24h"], "per_day": usage["per_day"],
+                "last_error": self.last_error}
+
+    def __repr__(self):
+        return f"SenderAccount({self.user!r})"
+
+
+class AccountPool:
+    """Sender accounts with stable lead -> account affinity.
+
+    Affinity uses rendezvous hashing, so adding or removing an account only
+    moves the leads that hashed to it. ``ranked()`` lists healthy accounts in
+    a lead's preference order, which is also the failover order.
+    """
+
+    def __init__(self, accounts=(), clock=None):
+        self.clock = clock or SYSTEM_CLOCK
+        self._accounts = {}
+        for account in accounts:
+            self.add(account)
+
+    def add(self, account):
+        self._accounts[account.user] = account
+        return account
+
+    def remove(self, user):
+        return self._accounts.pop(user, None)
+
+    def get(self, user):
+        return self._accounts.get(user)
+
+    def __iter__(self):
+        return iter(list(self._accounts.values()))
+
+    def __len__(self):
+        return len(self._accounts)
+
+    @staticmethod
+    def _score(key, user):
+        return hashlib.blake2b(f"{user}\0{key}".encode("utf-8"), digest_size=8).digest()
+
+    def ranked(self, lead_email, preferred=None):
+        """Healthy accounts for a lead, best first; ``preferred`` (the lead's pinned mailbox) leads."""
+        now = self.clock.time()
+        accounts = sorted(self._accounts.values(),
+                          key=lambda a: self._score(lead_email, a.user), reverse=True)
+        if preferred in self._accounts:
+            accounts.sort(key=lambda a: a.user != preferred)
+        return [a for a in accounts if a.healthy(now)]
+
+    def acquire(self, lead_email, preferred=None, stop_event=None, failover_wait=30):
+        """Return an account with a free send slot, waiting for quota when all are busy.
+
+        The preferred account is waited for when its slot frees up within
+        ``failover_wait`` seconds; otherwise the next healthy account takes
+        the send. While every account is throttled this waits for the first
+        one to come back. Returns None if stopped or every account is locked.
+        """
+        while stop_event is None or not stop_event.is_set():
+            ranked = self.ranked(lead_email, preferred)
+            if not ranked:
+                benched = [a.throttled_until for a in self._accounts.values() if not a.locked]
+                if not benched:
+                    return None
+                if self.clock.sleep(min(max(min(benched) - self.clock.time(), 0), 60), stop_event):
+                    return None
+                continue
+            shortest = None
+            for i, account in enumerate(ranked):
+                wait = account.rate_limiter.try_acquire()
+                if not wait:
+                    return account
+                shortest = wait if shortest is None else min(shortest, wait)
+                if i == 0 and wait <= failover_wait:
+                    break  # worth keeping the affinity
+            if self.clock.sleep(min(shortest, 60), stop_event):
+                return None
+        return None
+
+    def status(self):
+        return [account.status() for account in self]
@@ -1,210 +1,693 @@
+import os
 import time
+import queue
 import smtplib
-import imaplib
-import email
-import json
 import threading
-from email.mime.text import MIMEText
-import os
+from smtp_pool import SMTPPool, SESSION_STATES
+from send_pipeline import SendPipeline
+from retry import (SENT, TRANSIENT, RATE_LIMITED, SENDER_REJECTED, PERMANENT, SUPPRESSED, UNAVAILABLE,
+                   classify_error, RetryQueue, SendGovernor)
+from accounts import SenderAccount, AccountPool
+from imap_watcher import IMAPWatcher, open_imap
+from uid_fetcher import IncrementalFetcher
+from reply_parser import ReplyParser
+from reply_journal import ReplyJournal
+from lead_registry import LeadRegistry
+from scheduler import FollowUpScheduler
+from state_store import CampaignStore
+from message_index import MessageIndex
+from templates import TemplateEngine, build_raw
+from suppression import SuppressionIndex
+from clock import SYSTEM_CLOCK
+from metrics import Metrics, SamplingProfiler
+import bounces
 
 
 class GmailAutomation:
-    def __init__(self):
+    def __init__(self, messages_path="messages.json", data_dir="",
+                 smtp_host="smtp.gmail.com", smtp_port=465, imap_host="imap.gmail.com",
+                 imap_port=993, use_ssl=True, clock=None):
+        """``messages_path`` is the template file; campaign state files live in ``data_dir``.
+
+        The server settings default to Gmail; ``use_ssl=False`` is for local test servers.
+        ``clock`` is where every timestamp and wait comes from (simulator.py passes a VirtualClock).
+        """
+        def data(name):
+            return os.path.join(data_dir, name)
+
+        if data_dir:
+            os.makedirs(data_dir, exist_ok=True)
         self.running = False
-        self.leads = []
-        self.sent_times = {}
-        self.reply_counts = {}
-        self.followup_counts = {}
+        self.data_dir = data_dir
+        self.clock = clock or SYSTEM_CLOCK
+        self.metrics = Metrics()  # stage timings, counters and gauges (see metrics.py)
+        self.registry = LeadRegistry()
         self.followup_interval = 5 * 60  # 5 minutes in seconds
+        # Optional per-step delays, e.g. [1 * 86400, 3 * 86400, 7 * 86400]; the last one repeats
+        self.followup_intervals = None
         self.auto_reply_limit = 4
         self.followup_limit = 4
-        self.messages = self.load_messages()
+        self.templates = TemplateEngine(messages_path)
+        self.imap_host = imap_host
+        self.imap_port = imap_port
+        self.use_ssl = use_ssl
+        self.smtp_pool = SMTPPool(smtp_host, smtp_port, use_ssl=use_ssl)
+        self.send_workers = 4
+        self.accounts = AccountPool(clock=self.clock)
+        self.account_per_minute = 20   # per-account quotas, shaped to Gmail's limits
+        self.account_per_day = 500
+        self.governor = SendGovernor(clock=self.clock)   # slows every account down while Gmail is throttling
+        self.retry_queue = RetryQueue(clock=self.clock)  # failed sends waiting out their backoff
+        self.pipeline = None
+        self._replies = queue.SimpleQueue()
+        self._wake = threading.Event()
+        self.reply_parser = ReplyParser(max_chars=4000)  # reply bodies are cleaned and capped
+        self.uid_fetcher = IncrementalFetcher(data("imap_state.json"), parser=self.reply_parser,
+                                              metrics=self.metrics)
+        self.reply_journal = ReplyJournal(data("replies"))
+        self.reply_journal.import_json(data("replies.json"))  # one-time migration of the old format
+        self.store = CampaignStore(data("campaign.db"))
+        self.message_index = MessageIndex(self.store)  # Message-ID -> (lead, kind, step) of our sends
+        self.suppressions = SuppressionIndex(data("suppressed.bin"))  # bounced / rejected, across campaigns
+        self._stop_event = threading.Event()
+        self._threads = []  # campaign, loop and reply threads of the current run, joined by stop()
+        self.scheduler = FollowUpScheduler(on_wake=self._wake_loop)
+        self.leads_complete = threading.Event()  # cleared while a lead file is still loading
+        self.leads_complete.set()
+        self._leads_added = threading.Event()
+        self._register_gauges()
+
+    def _register_gauges(self):
+        gauge = self.metrics.gauge
+        gauge("leads", lambda: len(self.registry), "Leads loaded.")
+        gauge("replies_queued", lambda: self._replies.qsize(), "Replies waiting for the automation loop.")
+        gauge("initial_queued", lambda: self.pipeline and self.pipeline.submitted - self.pipeline.done,
+              "Initial emails submitted to the send pipeline and not yet done.")
+        gauge("followups_pending", lambda: len(self.scheduler), "Leads with a follow-up scheduled.")
+        gauge("retries_pending", lambda: len(self.retry_queue), "Failed sends waiting out their backoff.")
+        gauge("suppressed", lambda: len(self.suppressions), "Addresses on the suppression list.")
+        gauge("send_rate_factor", lambda: self.governor.factor, "Share of the configured send rate in use.")
+        gauge("account_sent_24h", lambda: [({"account": a.user}, a.rate_limiter.usage()["sent_24h"])
+                                           for a in self.accounts], "Emails sent per account in the last 24h.")
+        gauge("account_per_day", lambda: [({"account": a.user}, a.rate_limiter.per_day)
+                                          for a in self.accounts], "Daily quota per account.")
+        gauge("account_healthy", lambda: [({"account": a.user}, int(a.healthy()))
+                                          for a in self.accounts], "1 if the account can send right now.")
+        gauge("smtp_sessions", lambda: [({"state": k}, v) for k, v in self.smtp_stats().items()
+                                        if k in SESSION_STATES], "SMTP sessions by state (open, idle, in_use).")
+        gauge("smtp_pool_events", lambda: [({"event": k}, v) for k, v in self.smtp_stats().items()
+                                           if k not in SESSION_STATES],
+              "SMTP pool connects, reuses, NOOP checks, reconnects, retired sessions and errors so far.")
+
+    def smtp_stats(self):
+        """SMTPPool.stats(), or {} for transports without it (the simulator's)."""
+        stats = getattr(self.smtp_pool, "stats", None)
+        return stats() if stats else {}
+
+    @property
+    def leads(self):
+        return self.registry
+
+    @leads.setter
+    def leads(self, leads):
+        """Accepts any iterable of (name, email); duplicates are dropped."""
+        self.registry = leads if isinstance(leads, LeadRegistry) else LeadRegistry(leads)
+
+    @property
+    def messages(self):
+        """Raw contents of messages.json (the compiled templates live in self.templates)."""
+        return self.templates.data
 
     def load_messages(self):
-        try:
-            with open("messages.json", "r", encoding="utf-8") as f:
-                data = json.load(f)
-                # ✅ Ensure keys exist
-                if "initial" not in data or "auto_replies" not in data or "follow_ups" not in data:
-                    raise ValueError("messages.json must contain 'initial', 'auto_replies', and 'follow_ups'")
-                return data
-        except Exception as e:
-            print(f"Error loading messages.json: {e}")
-            return {"initial": {"subject": "Hello", "body": "Hi {name},"},
-                    "auto_replies": ["Thanks {name}, reply #{i+1}"],
-                    "follow_ups": ["Just checking in {name}"]}
+        self.templates.reload()
+        return self.templates.data
 
     def validate_credentials(self, gmail_user, app_password):
         """Check Gmail login before starting automation."""
         try:
-            # Validate SMTP
-            with smtplib.SMTP_SSL('smtp.gmail.com', 465) as server:
-                server.login(gmail_user, app_password)
+            # Validate SMTP (the session stays in the pool for the first sends)
+            self.smtp_pool.warm(gmail_user, app_password)
 
             # Validate IMAP
-            mail = imaplib.IMAP4_SSL('imap.gmail.com')
+            mail = open_imap(self.imap_host, self.imap_port, self.use_ssl)
             mail.login(gmail_user, app_password)
             mail.logout()
             return True
         except Exception as e:
             return str(e)
 
+    def add_account(self, user, password, per_minute=None, per_day=None):
+        """Register a sender mailbox; leads are spread across all registered accounts."""
+        account = self.accounts.get(user)
+        if account is None or account.password != password:
+            account = self.accounts.add(SenderAccount(
+                user, password,
+                per_minute=per_minute or self.account_per_minute,
+                per_day=per_day or self.account_per_day,
+                governor=self.governor,
+                clock=self.clock,
+            ))
+            # The 24h quota has to survive restarts and re-entered passwords: Gmail counts per mailbox
+            account.rate_limiter.preload(self.store.sent_since(user, self.clock.time() - 86400))
+        return account
+
     def send_email(self, gmail_user, app_password, to_email, subject, message):
+        """One-off send from a specific mailbox (no sharding)."""
+        account = self.accounts.get(gmail_user) or SenderAccount(gmail_user, app_password, clock=self.clock)
+        if not account.rate_limiter.acquire(self._stop_event):
+            return False
+        return self.send_raw(account, to_email, build_raw(gmail_user, to_email, subject, message)) == SENT
+
+    def send_template(self, lead, kind, step=0, extra_headers=()):
+        """Send the compiled ``kind`` template (initial / auto_replies / follow_ups) to a lead.
+
+        Goes out from the lead's pinned mailbox when it is healthy and has
+        quota, otherwise from the next account in the lead's failover order.
+        Every message gets a fresh Message-ID, recorded in the message index
+        once it is sent. Returns the outcome of the last attempt (SENT, TRANSIENT, RATE_LIMITED,
+        SENDER_REJECTED or PERMANENT), SUPPRESSED without sending if the address is on the
+        suppression list, or UNAVAILABLE if no account could take the send.
+        """
+        if lead.suppressed or lead.email in self.suppressions:
+            return SUPPRESSED
+        outcome = UNAVAILABLE  # stopped, or every account is locked
+        for _ in range(max(1, len(self.accounts))):
+            with self.metrics.time("quota_wait"):
+                account = self.accounts.acquire(lead.email, lead.account, self._stop_event)
+            if account is None:
+                return outcome
+            message_id = self.message_index.new_id(account.user)
+            with self.metrics.time("build_message"):
+                raw = self.templates.build(kind, step, account.user, lead.email, lead.name,
+                                           [("Message-ID", message_id), *extra_headers])
+            outcome = self.send_raw(account, lead.email, raw)
+            self.metrics.inc("emails_total", kind=kind, outcome=outcome)
+            if outcome == SENT:
+                lead.account = account.user
+                self.message_index.add(message_id, lead.email, kind, step, self.clock.time())
+                return outcome
+            if outcome == PERMANENT or account.healthy():
+                return outcome  # the account is fine, the send just failed
+        return outcome
+
+    def send_raw(self, account, to_email, raw):
+        """Send a prepared message; returns SENT or how the failure was classified."""
         try:
-            msg = MIMEText(message)
-            msg['Subject'] = subject
-            msg['From'] = gmail_user
-            msg['To'] = to_email
-
-            with smtplib.SMTP_SSL('smtp.gmail.com', 465) as server:
-                server.login(gmail_user, app_password)
-                server.sendmail(gmail_user, [to_email], msg.as_string())
-            return True
+            with self.metrics.time("smtp_send"):
+                self.smtp_pool.send(account.user, account.password, account.user, [to_email], raw)
+            account.mark_success()
+            self.governor.on_success()
+            return SENT
+        except smtplib.SMTPAuthenticationError as e:
+            if classify_error(e) == RATE_LIMITED:
+                # 454 4.7.0 "Too many login attempts": bench the account for a while, do not lock it
+                account.mark_throttled(e)
+                self.governor.on_throttle()
+                print(f"Login throttled for {account.user}: {e}")
+                return RATE_LIMITED
+            account.mark_locked(e)
+            print(f"Login rejected for {account.user}: {e}")
+            return TRANSIENT
         except Exception as e:
-            print(f"Error sending to {to_email}: {e}")
-            return False
+            outcome = classify_error(e)
+            if outcome == RATE_LIMITED:
+                # Bench this mailbox and slow every account down until it clears
+                account.mark_throttled(e)
+                self.governor.on_throttle()
+            elif outcome == SENDER_REJECTED:
+                # Gmail refused this mailbox (unverified alias, reputation block): bench it so
+                # the next account takes the send, without slowing the others down
+                account.mark_throttled(e, base=300)
+            else:
+                account.mark_error(e)
+            print(f"Error sending to {to_email} from {account.user} ({outcome}): {e}")
+            return outcome
 
-    def save_reply(self, sender, subject, body):
-        """Save replies into replies.json"""
-        reply_file = "replies.json"
-        data = []
-        if os.path.exists(reply_file):
-            try:
-                with open(reply_file, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-            except Exception:
-                data = []
+    def send_failed(self, lead, job, outcome, attempt, log_callback):
+        """Suppress the lead on a permanent rejection, otherwise queue ``job`` for a retry."""
+        if outcome == PERMANENT:
+            if self.suppress(lead.email, "failed"):
+                log_callback(f"🚫 {lead.email} rejected permanently, no more emails will be sent")
+        elif outcome == SUPPRESSED:
+            self.suppress(lead.email, "suppressed")
+        elif outcome == UNAVAILABLE:
+            if self._stop_event.is_set():
+                return  # stopping: the next start picks the lead up again
+            if all(account.locked for account in self.accounts):
+                # Only a new start() revalidates the logins, so retrying would spin forever
+                self.halt("🛑 Every sender account is locked (login rejected). "
+                          "Campaign stopped: check the app passwords and start again.", log_callback)
+            elif self.retry_queue.push(job, attempt):
+                # Nothing was attempted, so this does not use up one of the lead's retries
+                self._wake_loop()
+        elif self.retry_queue.push(job, attempt + 1):
+            self._wake_loop()
+        else:
+            log_callback(f"❌ Giving up on {job[0]} email to {lead.email} after {attempt} retries")
 
+    def suppress(self, email_addr, reason):
+        """Never mail this address again; returns its lead the first time a lead is suppressed."""
+        self.suppressions.add(email_addr)
+        lead = self.registry.get(email_addr)
+        if lead is None or lead.suppressed:
+            return None
+        lead.suppressed = True
+        self.scheduler.cancel(lead.email)
+        self.store.record(lead, reason, ts=self.clock.time())
+        self.store.set_next_due(lead.email, None)
+        return lead
+
+    def save_reply(self, sender, subject, body):
+        """Append a reply to the reply journal"""
+        now = self.clock.time()
         entry = {
             "sender": sender,
             "subject": subject,
             "body": body,
-            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
+            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now)),
+            "ts": now,  # what journal queries filter on
         }
-        data.append(entry)
+        with self.metrics.time("save_reply"):
+            self.reply_journal.append(entry)
 
-        with open(reply_file, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=4, ensure_ascii=False)
+    def get_imap_watcher(self, account):
+        """Return the long-lived IMAP connection for this mailbox."""
+        if account.watcher is None:
+            account.watcher = IMAPWatcher(account.user, account.password, host=self.imap_host,
+                                          port=self.imap_port, use_ssl=self.use_ssl,
+                                          stop_event=self._stop_event)
+        return account.watcher
 
-    def check_replies(self, gmail_user, app_password):
+    def check_replies(self, account):
+        """Fetch new mail; returns [(email, kind, detail)] for lead replies, auto-responses and bounces."""
+        watcher = self.get_imap_watcher(account)
         try:
-            mail = imaplib.IMAP4_SSL('imap.gmail.com')
-            mail.login(gmail_user, app_password)
-            mail.select("inbox")
-            status, data = mail.search(None, '(UNSEEN)')
-            if status != "OK":
-                return []
-
-            replies = []
-            for num in data[0].split():
-                status, msg_data = mail.fetch(num, '(RFC822)')
-                if status != "OK":
-                    continue
-                msg = email.message_from_bytes(msg_data[0][1])
-                from_email = email.utils.parseaddr(msg['From'])[1]
-
-                # ✅ Extract subject and body
-                subject = msg.get("Subject", "")
-                body = ""
-                if msg.is_multipart():
-                    for part in msg.walk():
-                        if part.get_content_type() == "text/plain":
-                            try:
-                                body = part.get_payload(decode=True).decode(errors="ignore")
-                            except Exception:
-                                body = ""
-                            break
-                else:
-                    try:
-                        body = msg.get_payload(decode=True).decode(errors="ignore")
-                    except Exception:
-                        body = ""
-
-                # ✅ Save reply before auto reply
-                if from_email in [lead[1] for lead in self.leads]:
-                    self.save_reply(from_email, subject, body)
-                    replies.append(from_email)
-
-            mail.logout()
-            return replies
+            with self.metrics.time("check_replies"):
+                with self.metrics.time("imap_connect"):
+                    mail = watcher.connection()
+                # Headers first; bodies only for lead mail, and only new UIDs since last check
+                messages = self.uid_fetcher.fetch_new(mail, account.user, watcher.uidvalidity,
+                                                      self.match_reply)
+                return self.incoming(messages)
         except Exception as e:
-            print("Error checking replies:", e)
+            print(f"Error checking replies for {account.user}:", e)
+            watcher.reset()
             return []
 
-    def automation_loop(self, gmail_user, app_password, log_callback):
+    def incoming(self, messages):
+        """Record fetched messages (uid_fetcher result dicts); returns [(email, kind, detail)]."""
+        registry = self.registry
+        replies = []
+        for m in messages:
+            if m["kind"] == bounces.BOUNCE:
+                # Dead addresses reported by a mailer-daemon
+                for recipient, status in m.get("bounced", ()):
+                    lead = registry.get(recipient)
+                    if lead is not None:
+                        replies.append((lead.email, bounces.BOUNCE, status))
+                        self.metrics.inc("messages_received_total", kind=bounces.BOUNCE)
+                continue
+            lead = registry.get(m["lead"])
+            if lead is None:
+                continue
+            self.metrics.inc("messages_received_total", kind=m["kind"])
+            if m["kind"] == bounces.AUTO_RESPONSE:
+                # Out-of-office and the like: logged, never answered
+                self.store.record(lead, "auto_response", ts=self.clock.time())
+                replies.append((lead.email, bounces.AUTO_RESPONSE, m["subject"]))
+                continue
+            # ✅ Save reply before auto reply
+            self.save_reply(m["sender"], m["subject"], m["body"])
+            lead.replied_at = self.clock.time()
+            if m["message_id"]:
+                # Answer in the same thread: In-Reply-To their message, References the chain
+                references = (m["references"] or [m["in_reply_to"]])[-10:]
+                lead.reply_headers = (("In-Reply-To", m["message_id"]),
+                                      ("References", " ".join([*filter(None, references), m["message_id"]])))
+            self.store.record(lead, "reply", ts=lead.replied_at)
+            replies.append((lead.email, bounces.REPLY, None))
+        return replies
+
+    def match_reply(self, sender, in_reply_to, references):
+        """Lead address an incoming message belongs to: by Message-ID threading, else by sender."""
+        found = self.message_index.resolve([in_reply_to, *reversed(references)])
+        if found and found[0] in self.registry:
+            return found[0]
+        lead = self.registry.get(sender)
+        return lead.email if lead else None
+
+    def reply_loop(self, account):
+        """Per-mailbox thread: wait for IMAP pushes and hand replies to the automation loop."""
+        watcher = self.get_imap_watcher(account)
         while self.running:
-            now = time.time()
-            replies = self.check_replies(gmail_user, app_password)
-
-            # Handle replies
-            for r in replies:
-                name = self.get_name_from_email(r)
-                reply_num = self.reply_counts.get(r, 0)
-                if reply_num < self.auto_reply_limit:
-                    try:
-                        message_text = self.messages["auto_replies"][reply_num].format(name=name)
-                    except Exception:
-                        message_text = f"Thank you {name}, this is auto reply #{reply_num + 1}"
-                    if self.send_email(gmail_user, app_password, r, f"Re: {self.messages['initial']['subject']}", message_text):
-                        self.reply_counts[r] = reply_num + 1
-                        log_callback(f"✅ Auto-replied #{reply_num + 1} to {r}")
-
-            # Handle follow-ups
-            for name, email_addr in self.leads:
-                if email_addr in replies:
-                    continue
-                if email_addr not in self.sent_times:
-                    continue
-                elapsed = now - self.sent_times[email_addr]
-                followup_num = self.followup_counts.get(email_addr, 0)
-                if elapsed >= self.followup_interval and followup_num < self.followup_limit:
-                    try:
-                        followup_text = self.messages["follow_ups"][followup_num].format(name=name)
-                    except Exception:
-                        followup_text = f"Hi {name}, just checking in (follow-up #{followup_num + 1})"
-                    if self.send_email(gmail_user, app_password, email_addr,
-                                    f"Follow-up: {self.messages['initial']['subject']}",
-                                    followup_text):
-                        self.sent_times[email_addr] = now
-                        self.followup_counts[email_addr] = followup_num + 1
-                        log_callback(f"📩 Sent follow-up #{followup_num + 1} to {email_addr}")
-
-            time.sleep(10)
-
-    def start(self, gmail_user, app_password, log_callback):
-        # ✅ First validate credentials
-        validation = self.validate_credentials(gmail_user, app_password)
-        if validation is not True:
-            log_callback(f"❌ Login failed: {validation}. Please try again with correct credentials.")
+            self.deliver(account.user, self.check_replies(account))
+            watcher.wait(watcher.idle_refresh)
+        watcher.close()
+
+    def deliver(self, user, replies):
+        """Hand [(email, kind, detail)] received by mailbox ``user`` to the automation loop."""
+        for email_addr, kind, detail in replies:
+            self._replies.put((user, email_addr, kind, detail))
+        if replies:
+            self._wake_loop()
+
+    def _wake_loop(self):
+        self._wake.set()
+
+    def followup_delay(self, lead, step):
+        """Seconds to wait before follow-up number ``step`` (0-based) for this lead."""
+        intervals = lead.followup_intervals or self.followup_intervals or [self.followup_interval]
+        return intervals[min(step, len(intervals) - 1)]
+
+    def schedule_followup(self, lead, since):
+        if lead.followup_count < self.followup_limit:
+            due = since + self.followup_delay(lead, lead.followup_count)
+            self.scheduler.schedule(lead.email, due, lead.followup_count)
+        else:
+            due = None
+            self.scheduler.cancel(lead.email)
+        self.store.set_next_due(lead.email, due)
+
+    def _drain_replies(self):
+        replies = []
+        try:
+            while True:
+                replies.append(self._replies.get_nowait())
+        except queue.Empty:
+            pass
+        return replies
+
+    def send_auto_reply(self, lead, reply_num, log_callback, attempt=0):
+        if lead.suppressed or lead.reply_count != reply_num or reply_num >= self.auto_reply_limit:
+            return False
+        outcome = self.send_template(lead, "auto_replies", reply_num, lead.reply_headers)
+        if outcome != SENT:
+            self.send_failed(lead, ("auto_reply", lead.email, reply_num), outcome, attempt, log_callback)
+            return False
+        lead.reply_count = reply_num + 1
+        self.store.record(lead, "auto_reply", reply_num, self.clock.time())
+        log_callback(f"✅ Auto-replied #{reply_num + 1} to {lead.email}")
+        return True
+
+    def send_followup(self, lead, followup_num, log_callback, attempt=0):
+        if lead.suppressed or lead.followup_count != followup_num or followup_num >= self.followup_limit:
+            return False
+        outcome = self.send_template(lead, "follow_ups", followup_num)
+        if outcome != SENT:
+            self.send_failed(lead, ("followup", lead.email, followup_num), outcome, attempt, log_callback)
+            return False
+        now = self.clock.time()
+        lead.last_sent = now
+        lead.followup_count = followup_num + 1
+        self.store.record(lead, "followup", followup_num, now)
+        log_callback(f"📩 Sent follow-up #{followup_num + 1} to {lead.email}")
+        self.schedule_followup(lead, now)
+        return True
+
+    def retry_due(self, now, log_callback):
+        """Resend failed emails whose backoff has expired."""
+        for (kind, email_addr, step), attempt in self.retry_queue.pop_due(now):
+            lead = self.registry.get(email_addr)
+            if lead is None or lead.suppressed:
+                continue
+            if kind == "initial":
+                if lead.sent_at is None:
+                    self.send_initial(lead, log_callback, attempt)
+            elif kind == "followup":
+                self.send_followup(lead, step, log_callback, attempt)
+            elif kind == "auto_reply":
+                self.send_auto_reply(lead, step, log_callback, attempt)
+
+    def automation_loop(self, log_callback):
+        while self.running:
+            self._wake.clear()
+            next_due = self.process_due(log_callback)
+
+            # Sleep until the next follow-up or retry is due, a reply arrives or we are woken
+            timeout = None if next_due is None else next_due - self.clock.time()
+            if timeout is None or timeout > 0:
+                self._wake.wait(timeout)
+
+    def process_due(self, log_callback):
+        """One pass of the automation loop: handle queued replies, due follow-ups and retries.
+
+        Returns when the next follow-up or retry is due (None if nothing is).
+        """
+        with self.metrics.time("loop_iteration"):
+            return self._process_due(log_callback)
+
+    def _process_due(self, log_callback):
+        self.templates.maybe_reload()
+
+        # Handle replies collected by the per-mailbox reply loops
+        for user, r, kind, detail in self._drain_replies():
+            lead = self.registry.get(r)
+            if lead is None or lead.suppressed:
+                continue
+            if kind == bounces.BOUNCE:
+                if self.suppress(r, "bounce"):
+                    log_callback(f"🚫 {r} bounced ({detail}), no more emails will be sent")
+                continue
+            if kind == bounces.AUTO_RESPONSE:
+                log_callback(f"🏖️ Auto-response from {r} ({detail}), not answered")
+                continue
+            lead.account = user  # answer from the mailbox the lead wrote to
+            self.send_auto_reply(lead, lead.reply_count, log_callback)
+            # A reply restarts the follow-up clock for that lead
+            if lead.last_sent is not None:
+                self.schedule_followup(lead, self.clock.time())
+
+        # Handle follow-ups that are due (heap pop, no scan over all leads)
+        for email_addr, step in self.scheduler.pop_due(self.clock.time()):
+            lead = self.registry.get(email_addr)
+            if lead is not None:
+                self.send_followup(lead, step, log_callback)
+
+        self.retry_due(self.clock.time(), log_callback)
+        self.store.flush()
+        pending = [t for t in (self.scheduler.next_due(), self.retry_queue.next_due()) if t is not None]
+        return min(pending) if pending else None
+
+    def send_initial(self, lead, log_callback, attempt=0):
+        email_addr = lead.email
+        outcome = self.send_template(lead, "initial")
+        if outcome == SENT:
+            lead.sent_at = lead.last_sent = self.clock.time()
+            lead.reply_count = 0
+            lead.followup_count = 0
+            self.store.record(lead, "initial", 0, lead.sent_at)
+            log_callback(f"✅ Sent initial email to {email_addr}")
+            self.schedule_followup(lead, lead.sent_at)
+            return True
+        self.send_failed(lead, ("initial", email_addr, 0), outcome, attempt, log_callback)
+        return False
+
+    def run_campaign(self, log_callback):
+        """Validate, start the reply/follow-up loops and push initial emails through the pipeline."""
+        # ✅ First validate credentials of every sender account
+        usable = []
+        for account in self.accounts:
+            validation = self.validate_credentials(account.user, account.password)
+            if validation is True:
+                account.locked = False
+                usable.append(account)
+            else:
+                account.mark_locked(validation)
+                log_callback(f"❌ Login failed for {account.user}: {validation}. "
+                             "Please try again with correct credentials.")
+        if not usable:
             self.running = False
             return  # 🚨 STOP here if login fails
 
-        self.running = True
         log_callback("🚀 Automation started.")  # ✅ Log only after successful login
 
-        # Send initial emails
-        for name, email_addr in self.leads:
-            message_text = self.messages["initial"]["body"].format(name=name)
-            if self.send_email(gmail_user, app_password, email_addr,
-                           self.messages["initial"]["subject"], message_text):
-                self.sent_times[email_addr] = time.time()
-                self.reply_counts[email_addr] = 0
-                self.followup_counts[email_addr] = 0
-                log_callback(f"✅ Sent initial email to {email_addr}")
-
-        # Start background loop
+        # Start background loops right away so early replies are not delayed;
+        # every mailbox gets its own reply loop so they are checked in parallel
+        for account in usable:
+            t = threading.Thread(target=self.reply_loop, args=(account,),
+                                 name=f"replies-{account.user}", daemon=True)
+            t.start()
+            self._threads.append(t)
         t = threading.Thread(
             target=self.automation_loop,
-            args=(gmail_user, app_password, log_callback),
+            args=(log_callback,),
+            daemon=True
+        )
+        t.start()
+        self._threads.append(t)
+
+        # Send initial emails through the bounded, rate-limited worker pool
+        def on_progress(done, submitted, sent, failed):
+            if done % 50 == 0:
+                log_callback(f"📤 Initial emails: {done}/{submitted} processed ({sent} sent, {failed} failed)")
+
+        # A local name: after a quick Stop -> Start this thread must not touch the new run's pipeline
+        self.pipeline = pipeline = SendPipeline(
+            lambda lead: self.send_initial(lead, log_callback),
+            workers=self.send_workers,
+            on_progress=on_progress,
+        ).start()
+
+        # Keep feeding while leads are still streaming in from a file
+        position = 0
+        while self.running and not pipeline.cancelled:
+            complete = self.leads_complete.is_set()
+            batch = self.registry.since(position)
+            position += len(batch)
+            self.templates.maybe_reload()
+            for lead in self.resume(batch):
+                if not pipeline.submit(lead):
+                    break
+            if complete and position >= len(self.registry):
+                break
+            self._leads_added.wait(0.5)
+            self._leads_added.clear()
+        pipeline.close()
+        pipeline.join()
+        self.store.flush()
+        # Resumed and suppressed leads are never submitted, so the total is what went in
+        log_callback(f"📤 Initial emails finished: {pipeline.done}/{pipeline.submitted} processed "
+                     f"({pipeline.sent} sent, {pipeline.failed} failed)")
+
+    def resume(self, leads):
+        """Restore saved campaign state onto ``leads``; returns those still waiting for their initial email.
+
+        Leads that already got it only need their follow-up re-armed, and a
+        reply the last run recorded but never answered (it stopped in
+        between) is queued for its auto-reply again.
+        """
+        due = self.store.restore(leads)
+        pending, started = [], []
+        for lead in leads:
+            if lead.suppressed or lead.email in self.suppressions:
+                continue
+            if lead.sent_at is None:
+                pending.append(lead)
+                continue
+            started.append(lead.email)
+            if lead.email in due:
+                self.scheduler.schedule(lead.email, due[lead.email], lead.followup_count)
+        unanswered = self.store.unanswered(started)
+        for email_addr in unanswered:
+            lead = self.registry.get(email_addr)
+            self._replies.put((lead.account, email_addr, bounces.REPLY, None))
+        if unanswered:
+            self._wake_loop()
+        return pending
+
+    def add_leads(self, leads):
+        """Add (name, email) pairs, e.g. a batch from the ingestor; a running campaign picks them up."""
+        added = self.registry.load(leads)
+        if added:
+            self._leads_added.set()
+        return added
+
+    def start(self, gmail_user=None, app_password=None, log_callback=print):
+        """Start the campaign in the background and return immediately.
+
+        ``gmail_user``/``app_password`` replace the sender accounts, so a
+        single-account setup needs nothing else (and a different login
+        after a restart stops the old mailbox from sending).
+        """
+        if self.running:
+            return
+        if gmail_user:
+            for account in self.accounts:
+                if account.user != gmail_user:
+                    self.accounts.remove(account.user)
+            self.add_account(gmail_user, app_password)
+        if not len(self.accounts):
+            log_callback("❌ No sender account configured.")
+            return
+        self.running = True
+        self._stop_event.clear()
+        t = threading.Thread(
+            target=self.run_campaign,
+            args=(log_callback,),
             daemon=True
         )
         t.start()
+        self._threads = [t]
+
+    def stop(self, timeout=30):
+        """Stop the campaign and wait for its threads, so sends in flight are recorded before the flush.
 
-    def stop(self):
+        Each thread gets up to ``timeout`` seconds (a send that is already
+        talking to Gmail finishes first).
+        """
         self.running = False
+        self._stop_event.set()
+        self._wake_loop()
+        for account in self.accounts:
+            if account.watcher is not None:
+                account.watcher.wake()
+        if self.pipeline:
+            self.pipeline.cancel()
+            self.pipeline.join(timeout)
+        threads = self._threads
+        if threads:
+            threads[0].join(timeout)  # the campaign thread first: it starts the others
+        for t in threads[1:]:
+            t.join(timeout)
+        self._threads = []
+        self.reply_journal.flush()
+        self.store.flush()
+        self.smtp_pool.close_all()
+        self.reply_parser.close()
+
+    def halt(self, reason, log_callback):
+        """Stop the campaign from one of its own threads (nothing is joined) and log why."""
+        if self._stop_event.is_set():
+            return
+        self.running = False
+        self._stop_event.set()
+        self._wake_loop()
+        for account in self.accounts:
+            if account.watcher is not None:
+                account.watcher.wake()
+        if self.pipeline:
+            self.pipeline.cancel()
+        log_callback(reason)
+
+    def close(self):
+        """stop() and close the campaign files; the object cannot be started again."""
+        self.stop()
+        self.reply_journal.close()
+        self.store.close()
+        self.suppressions.close()
+
+    def profile(self, seconds=10, interval=0.005):
+        """Sample every thread for ``seconds`` and dump the hot paths.
+
+        Collapsed stacks go to profile-<time>.folded in the data directory;
+        returns (that path, a text report of the hottest functions).
+        """
+        profiler = SamplingProfiler(interval, exclude=[threading.get_ident()]).start()
+        time.sleep(seconds)
+        profiler.stop()
+        path = os.path.join(self.data_dir, time.strftime("profile-%Y%m%d-%H%M%S.folded"))
+        return profiler.dump(path), profiler.report()
+
+    def status(self):
+        """Snapshot of the campaign for status displays and the headless status socket."""
+        pipeline = self.pipeline
+        return {
+            "running": self.running,
+            "leads": len(self.registry),
+            "leads_loading": not self.leads_complete.is_set(),
+            "initial": None if pipeline is None else {
+                "submitted": pipeline.submitted, "done": pipeline.done,
+                "sent": pipeline.sent, "failed": pipeline.failed},
+            "followups_pending": len(self.scheduler),
+            "retries_pending": len(self.retry_queue),
+            "suppressed": len(self.suppressions),
+            "send_rate_factor": round(self.governor.factor, 3),
+            "events": self.store.counts(),
+            "accounts": self.accounts.status(),
+            "smtp_pool": self.smtp_stats(),
+            "stages": self.metrics.stages(),
+        }
 
     def get_name_from_email(self, email_addr):
-        for name, e in self.leads:
-            if e == email_addr:
-                return name
-        return ""
+        lead = self.registry.get(email_addr)
+        return lead.name if lead else ""
@@ -0,0 +1,191 @@
+import os
+import sys
+import json
+import time
+import argparse
+import shutil
+import platform
+import tempfile
+import threading
+import subprocess
+from fake_servers import FakeGmail
+
+try:
+    import resource  # not on Windows
+except ImportError:
+    resource = None
+
+# Throughput benchmark against the in-process fake Gmail (fake_servers.py):
+#
+#   python benchmark.py                     # 1k and 10k leads
+#   python benchmark.py --leads 1000 10000 100000 --reply-rate 0.2 --smtp-latency 0.002
+#
+# Every size runs in a fresh process (clean memory numbers). Results are
+# appended to bench_results.jsonl and compared with the previous run that
+# used the same settings, so regressions show up as a percentage change.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+METRICS = (("send_rate", "msg/s", True), ("latency_p50_ms", "ms", False),
+           ("latency_p99_ms", "ms", False), ("loop_cpu_s", "s", False),
+           ("cpu_s", "s", False), ("peak_rss_mb", "MB", False))
+
+
+def _percentile(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _thread_cpu(name_part):
+    """CPU seconds used so far by the first live thread whose name contains ``name_part``."""
+    if not hasattr(time, "pthread_getcpuclockid"):
+        return None
+    for t in threading.enumerate():
+        if name_part in t.name and t.ident:
+            try:
+                return time.clock_gettime(time.pthread_getcpuclockid(t.ident))
+            except OSError:
+                return None
+    return None
+
+
+def run_once(leads, args):
+    """Drive one campaign of ``leads`` synthetic leads; returns the metrics dict."""
+    from automation import GmailAutomation
+
+    fake = FakeGmail(reply_rate=args.reply_rate, seed=leads, latency=args.smtp_latency,
+                     throttle_every=args.throttle_every).start()
+    fake.imap.latency = args.imap_latency
+    data_dir = tempfile.mkdtemp(prefix="bench-")
+    bot = GmailAutomation(os.path.join(HERE, "messages.json"), data_dir, **fake.server_settings())
+    bot.account_per_minute = 10 ** 9   # measure the engine, not the Gmail quota
+    bot.account_per_day = 0
+    bot.followup_interval = 10 ** 6    # follow-ups are out of scope
+    bot.send_workers = args.workers
+    bot.add_account("bench@sender.test", "app-password")
+    bot.add_leads((f"Lead {i}", f"lead{i}@leads.test") for i in range(leads))
+
+    cpu_start = time.process_time()
+    started = time.perf_counter()
+    bot.start(log_callback=lambda text: None)
+    while not (bot.pipeline and bot.pipeline.done >= leads):
+        time.sleep(0.01)
+    send_seconds = time.perf_counter() - started
+
+    deadline = time.monotonic() + args.reply_timeout
+    while len(fake.latencies) < fake.replies_sent and time.monotonic() < deadline:
+        time.sleep(0.01)
+    loop_cpu = _thread_cpu("automation_loop")
+    cpu = time.process_time() - cpu_start
+    bot.close()
+    fake.close()
+    shutil.rmtree(data_dir, ignore_errors=True)
+
+    latencies = fake.latencies
+    return {
+        "leads": leads,
+        "sent": bot.pipeline.sent,
+        "send_seconds": round(send_seconds, 3),
+        "send_rate": round(bot.pipeline.sent / send_seconds, 1),
+        "replies": fake.replies_sent,
+        "auto_replies": len(latencies),
+        "latency_p50_ms": None if not latencies else round(_percentile(latencies, 50) * 1000, 1),
+        "latency_p99_ms": None if not latencies else round(_percentile(latencies, 99) * 1000, 1),
+        "loop_cpu_s": None if loop_cpu is None else round(loop_cpu, 3),
+        "cpu_s": round(cpu, 3),
+        "peak_rss_mb": _peak_rss_mb(),
+        "throttled": fake.smtp.throttled,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def _settings(args):
+    return {"reply_rate": args.reply_rate, "smtp_latency": args.smtp_latency,
+            "imap_latency": args.imap_latency, "throttle_every": args.throttle_every,
+            "workers": args.workers}
+
+
+def _previous(path, settings, leads):
+    """The last stored result for the same settings and lead count."""
+    last = None
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if entry.get("settings") == settings and entry.get("leads") == leads:
+                    last = entry
+    return last
+
+
+def _change(new, old, higher_is_better):
+    if new is None or not old:
+        return ""
+    delta = (new - old) / old * 100
+    worse = delta < 0 if higher_is_better else delta > 0
+    return f" ({delta:+.0f}%{' ⚠' if worse and abs(delta) >= 10 else ''})"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the automation engine against a fake Gmail.")
+    parser.add_argument("--leads", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--reply-rate", type=float, default=0.1, help="share of leads that reply")
+    parser.add_argument("--smtp-latency", type=float, default=0.0, help="seconds per accepted message")
+    parser.add_argument("--imap-latency", type=float, default=0.0, help="seconds per IMAP command")
+    parser.add_argument("--throttle-every", type=int, default=0, help="answer every Nth send with 421")
+    parser.add_argument("--workers", type=int, default=4, help="send workers")
+    parser.add_argument("--reply-timeout", type=float, default=60, help="max wait for auto-replies")
+    parser.add_argument("--out", default=os.path.join(HERE, "bench_results.jsonl"))
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        print(json.dumps(run_once(args.child, args)))
+        return 0
+
+    settings = _settings(args)
+    child_args = list(argv if argv is not None else sys.argv[1:])
+    for leads in args.leads:
+        cmd = [sys.executable, os.path.abspath(__file__), *child_args, "--child", str(leads)]
+        proc = subprocess.run(cmd, capture_output=True, text=True, cwd=tempfile.gettempdir())
+        lines = proc.stdout.strip().splitlines()
+        if proc.returncode or not lines:
+            print(f"{leads} leads: benchmark failed\n{proc.stderr[-2000:]}")
+            return 1
+        result = json.loads(lines[-1])
+        previous = _previous(args.out, settings, leads)
+        entry = {"ts": time.strftime("%Y-%m-%d %H:%M:%S"), "commit": _git_commit(),
+                 "python": platform.python_version(), "settings": settings, **result}
+        with open(args.out, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+
+        print(f"{leads} leads: {result['sent']} sent in {result['send_seconds']}s, "
+              f"{result['auto_replies']}/{result['replies']} replies answered")
+        for key, unit, higher_is_better in METRICS:
+            value = result.get(key)
+            old = previous.get(key) if previous else None
+            shown = "n/a" if value is None else f"{value} {unit}"
+            print(f"  {key:<15} {shown}{_change(value, old, higher_is_better)}")
+    print(f"Results appended to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+import re
+from email import message_from_bytes
+from email.utils import getaddresses
+
+# What an incoming message turned out to be
+REPLY = "reply"              # a genuine reply from a lead
+AUTO_RESPONSE = "auto"       # out-of-office / vacation / autoresponder
+BOUNCE = "bounce"            # delivery-status notification
+
+_DAEMON_RE = re.compile(r"^(mailer-daemon|postmaster|mail-daemon|mailerdaemon)@", re.I)
+_AUTO_SUBJECT_RE = re.compile(
+    r"^\s*(auto(matic)?[ -]?(reply|response|antwort)|out of (the )?office|"
+    r"abwesenheit|r[ée]ponse automatique|vacation|away from)", re.I)
+_BOUNCE_SUBJECT_RE = re.compile(
+    r"(undeliver|delivery status notification|delivery (has )?failed|returned mail|"
+    r"failure notice|mail delivery (failed|subsystem))", re.I)
+_FINAL_RECIPIENT_RE = re.compile(r"^(?:Final|Original)-Recipient:\s*[^;]*;\s*<?([^>\s]+)>?", re.I | re.M)
+_STATUS_RE = re.compile(r"\b([245])\.\d{1,3}\.\d{1,3}\b")
+
+# Header fields the classifier needs, for IMAP HEADER.FIELDS fetches
+HEADER_FIELDS = "CONTENT-TYPE AUTO-SUBMITTED X-AUTOREPLY X-AUTORESPOND PRECEDENCE"
+
+
+def classify(sender, headers):
+    """Return REPLY, AUTO_RESPONSE or BOUNCE from a message's sender and headers."""
+    content_type = (headers.get("Content-Type") or "").lower()
+    subject = headers.get("Subject") or ""
+    if "multipart/report" in content_type and "delivery-status" in content_type:
+        return BOUNCE
+    if _DAEMON_RE.match(sender or "") and (_BOUNCE_SUBJECT_RE.search(subject) or not subject):
+        return BOUNCE
+    auto_submitted = (headers.get("Auto-Submitted") or "no").strip().lower()
+    precedence = (headers.get("Precedence") or "").strip().lower()
+    if (auto_submitted != "no" or headers.get("X-Autoreply") or headers.get("X-Autorespond")
+            or precedence in ("auto_reply", "bulk", "junk") or _AUTO_SUBJECT_RE.match(subject)):
+        return AUTO_RESPONSE
+    return REPLY
+
+
+def parse_dsn(raw):
+    """[(recipient, status)] of recipients a DSN reports as permanently failed.
+
+    Reads the message/delivery-status part of a multipart/report (RFC 3464);
+    for non-standard bounces it falls back to Final-Recipient lines and the
+    addresses near a 5.x.x status code in the text.
+    """
+    msg = message_from_bytes(raw)
+    failed = []
+    for part in msg.walk():
+        if part.get_content_type() != "message/delivery-status":
+            continue
+        # Each per-recipient block is parsed as a sub-message by the email package
+        blocks = part.get_payload() if part.is_multipart() else []
+        for block in blocks:
+            action = (block.get("Action") or "").strip().lower()
+            status = (block.get("Status") or "").strip()
+            recipient = block.get("Final-Recipient") or block.get("Original-Recipient") or ""
+            recipient = recipient.split(";", 1)[-1].strip().strip("<>")
+            if recipient and action == "failed" and not status.startswith("4"):
+                failed.append((recipient, status or "5.0.0"))
+    if failed:
+        return failed
+
+    text = _text_of(msg)
+    statuses = [m.group(0) for m in _STATUS_RE.finditer(text)]
+    if not any(s.startswith("5") for s in statuses):
+        return []
+    status = next(s for s in statuses if s.startswith("5"))
+    recipients = _FINAL_RECIPIENT_RE.findall(text)
+    if not recipients:
+        # Gmail style: "Your message wasn't delivered to someone@example.com because..."
+        recipients = [addr for _, addr in getaddresses(re.findall(r"[\w.+-]+@[\w-]+\.[\w.-]+", text))]
+    return [(r, status) for r in dict.fromkeys(recipients)]
+
+
+def _text_of(msg):
+    chunks = []
+    for part in msg.walk():
+        if part.get_content_type() == "message/rfc822":
+            break  # the returned original; its addresses are ours, not the failed ones
+        if part.get_content_maintype() == "text":
+            payload = part.get_payload(decode=True) or b""
+            chunks.append(payload.decode(part.get_content_charset() or "utf-8", errors="ignore"))
+    return "\n".join(chunks)
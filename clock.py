@@ -0,0 +1,48 @@
+import math
+import time
+
+
+class SystemClock:
+    """Wall-clock time. Everything that schedules sends reads time through a clock
+    object, so a simulation can swap in a VirtualClock."""
+
+    def time(self):
+        return time.time()
+
+    def monotonic(self):
+        return time.monotonic()
+
+    def sleep(self, seconds, stop_event=None):
+        """Wait ``seconds``; returns True if ``stop_event`` fired first (like Event.wait)."""
+        if stop_event is None:
+            time.sleep(seconds)
+            return False
+        return stop_event.wait(seconds)
+
+
+class VirtualClock:
+    """Simulated time for single-threaded replays: sleeping just moves the clock forward.
+
+    ``monotonic()`` is the same as ``time()``, so quotas and cooldowns
+    measured on either run on simulated time too.
+    """
+
+    def __init__(self, start=None):
+        self.now = time.time() if start is None else start
+
+    def time(self):
+        return self.now
+
+    monotonic = time
+
+    def sleep(self, seconds, stop_event=None):
+        if seconds > 0:
+            # Always move forward: a tiny wait added to an epoch timestamp can round away
+            self.now = max(self.now + seconds, math.nextafter(self.now, math.inf))
+        return bool(stop_event and stop_event.is_set())
+
+    def advance_to(self, t):
+        self.now = max(self.now, t)
+
+
+SYSTEM_CLOCK = SystemClock()
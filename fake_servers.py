@@ -0,0 +1,368 @@
+import re
+import time
+import random
+import select
+import threading
+import socketserver
+from email.parser import BytesHeaderParser
+from email.utils import make_msgid, parseaddr
+
+# In-process stand-ins for Gmail's SMTP and IMAP servers, for benchmarks and
+# local runs: plain TCP on 127.0.0.1 (use GmailAutomation(..., use_ssl=False)),
+# any login accepted. They speak just enough of each protocol for smtplib,
+# imaplib and this project's fetcher and IDLE loop.
+
+_FIELDS_RE = re.compile(rb"HEADER\.FIELDS \(([^)]*)\)", re.I)
+_PARTIAL_RE = re.compile(rb"BODY\.PEEK\[([^\]]*)\](?:<(\d+)\.(\d+)>)?", re.I)
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    # Buffered writes flushed once per response, and no Nagle: otherwise every
+    # multi-line response stalls ~40ms on delayed ACKs and swamps the numbers
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+
+class Mailbox:
+    """Messages of one IMAP user: [uid, raw bytes, seen], with a change counter for IDLE."""
+
+    def __init__(self):
+        self.messages = []
+        self.next_uid = 1
+        self.cond = threading.Condition()
+
+    def deliver(self, raw):
+        with self.cond:
+            self.messages.append([self.next_uid, raw, False])
+            self.next_uid += 1
+            self.cond.notify_all()
+
+    def __len__(self):
+        return len(self.messages)
+
+
+class FakeSMTPServer:
+    """SMTP sink with injectable latency, throttling and hard bounces.
+
+    ``latency`` seconds are spent on every accepted message; every
+    ``throttle_every``-th message is refused with 421 4.7.0 and the
+    connection dropped (like Gmail's rate limiting); recipients in
+    ``reject`` get 550 5.1.1. ``on_message(from_addr, to_addrs, raw)``
+    sees every accepted message.
+    """
+
+    def __init__(self, latency=0.0, throttle_every=0, reject=(), on_message=None):
+        self.latency = latency
+        self.throttle_every = throttle_every
+        self.reject = set(reject)
+        self.on_message = on_message
+        self.accepted = 0
+        self.throttled = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+        self._transactions = 0
+        self._server = None
+        self.port = None
+
+    def start(self):
+        owner = self
+
+        class Handler(_Handler):
+            def reply(self, text):
+                self.wfile.write(text.encode() + b"\r\n")
+                self.wfile.flush()
+
+            def handle(self):
+                self.reply("220 fake-smtp ready")
+                mail_from, rcpts = None, []
+                while True:
+                    line = self.rfile.readline()
+                    if not line:
+                        return
+                    cmd = line.decode(errors="ignore").strip()
+                    verb = cmd.split(" ", 1)[0].upper()
+                    if verb in ("EHLO", "HELO"):
+                        self.reply("250-fake-smtp\r\n250-AUTH PLAIN\r\n250 8BITMIME")
+                    elif verb == "AUTH":
+                        self.reply("235 2.7.0 Accepted")
+                    elif verb == "MAIL":
+                        mail_from, rcpts = parseaddr(cmd[10:])[1], []
+                        self.reply("250 2.1.0 OK")
+                    elif verb == "RCPT":
+                        rcpt = parseaddr(cmd[8:])[1]
+                        with owner._lock:
+                            owner._transactions += 1
+                            throttle = owner.throttle_every and owner._transactions % owner.throttle_every == 0
+                        if throttle:
+                            owner.throttled += 1
+                            self.reply("421 4.7.0 Try again later, closing connection.")
+                            return
+                        if rcpt in owner.reject:
+                            owner.rejected += 1
+                            self.reply("550 5.1.1 The email account that you tried to reach does not exist.")
+                        else:
+                            rcpts.append(rcpt)
+                            self.reply("250 2.1.5 OK")
+                    elif verb == "DATA":
+                        self.reply("354 Go ahead")
+                        lines = []
+                        while True:
+                            data = self.rfile.readline()
+                            if not data or data in (b".\r\n", b".\n"):
+                                break
+                            lines.append(data[1:] if data.startswith(b"..") else data)
+                        if owner.latency:
+                            time.sleep(owner.latency)
+                        with owner._lock:
+                            owner.accepted += 1
+                        if owner.on_message:
+                            owner.on_message(mail_from, rcpts, b"".join(lines))
+                        self.reply("250 2.0.0 OK queued")
+                    elif verb in ("NOOP", "RSET"):
+                        self.reply("250 2.0.0 OK")
+                    elif verb == "QUIT":
+                        self.reply("221 2.0.0 Bye")
+                        return
+                    else:
+                        self.reply("502 5.5.1 Unrecognized command")
+
+        self._server = _Server(("127.0.0.1", 0), Handler)
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, name="fake-smtp", daemon=True).start()
+        return self
+
+    def close(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+
+class FakeIMAPServer:
+    """IMAP server over in-memory mailboxes (one per login), with IDLE push.
+
+    Supports what IncrementalFetcher and IMAPWatcher use: LOGIN, SELECT,
+    UID SEARCH (UNSEEN / UID n:*), UID FETCH of header fields,
+    BODYSTRUCTURE and partial BODY.PEEK sections, UID STORE, IDLE and
+    NOOP. Messages are treated as single-part text/plain.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.mailboxes = {}
+        self._lock = threading.Lock()
+        self._server = None
+        self.port = None
+
+    def mailbox(self, user):
+        with self._lock:
+            return self.mailboxes.setdefault(user, Mailbox())
+
+    def deliver(self, user, raw):
+        self.mailbox(user).deliver(raw)
+
+    def start(self):
+        owner = self
+
+        class Handler(_Handler):
+            def send(self, data):
+                self.wfile.write(data if isinstance(data, bytes) else data.encode() + b"\r\n")
+
+            def handle(self):
+                self.send("* OK fake-imap ready")
+                self.wfile.flush()
+                box = None
+                self.reported = 0  # EXISTS count this session has been told about
+                while True:
+                    line = self.rfile.readline()
+                    if not line:
+                        return
+                    parts = line.rstrip(b"\r\n").split(b" ", 2)
+                    tag = parts[0].decode(errors="ignore")
+                    cmd = parts[1].decode(errors="ignore").upper() if len(parts) > 1 else ""
+                    rest = parts[2] if len(parts) > 2 else b""
+                    if owner.latency:
+                        time.sleep(owner.latency)
+                    if cmd == "CAPABILITY":
+                        self.send("* CAPABILITY IMAP4rev1 IDLE UIDPLUS")
+                    elif cmd == "LOGIN":
+                        user = rest.split(b" ", 1)[0].strip(b'"').decode(errors="ignore")
+                        box = owner.mailbox(user)
+                    elif cmd in ("SELECT", "EXAMINE"):
+                        self.reported = len(box)
+                        self.send(f"* {self.reported} EXISTS")
+                        self.send("* OK [UIDVALIDITY 1] UIDs valid")
+                        self.send(f"* OK [UIDNEXT {box.next_uid}] Predicted next UID")
+                        self.send(f"{tag} OK [READ-WRITE] {cmd} completed")
+                        self.wfile.flush()
+                        continue
+                    elif cmd == "UID":
+                        self.uid_command(box, rest)
+                    elif cmd == "IDLE":
+                        if not self.idle(box):
+                            return
+                    elif cmd == "LOGOUT":
+                        self.send("* BYE logging out")
+                        self.send(f"{tag} OK LOGOUT completed")
+                        self.wfile.flush()
+                        return
+                    self.send(f"{tag} OK {cmd} completed")
+                    self.wfile.flush()
+
+            def uid_command(self, box, rest):
+                sub, _, args = rest.partition(b" ")
+                sub = sub.upper()
+                with box.cond:
+                    messages = list(enumerate(box.messages, start=1))
+                if sub == b"SEARCH":
+                    if args.upper().startswith(b"UNSEEN"):
+                        uids = [m[0] for _, m in messages if not m[2]]
+                    else:
+                        low = int(args.split()[1].split(b":")[0])
+                        uids = [m[0] for _, m in messages if m[0] >= low]
+                        if not uids and messages:
+                            uids = [messages[-1][1][0]]  # "n:*" always matches the last message
+                    self.send("* SEARCH " + " ".join(map(str, uids)))
+                    return
+                uid_set, _, items = args.partition(b" ")
+                wanted = set()
+                for token in uid_set.split(b","):
+                    lo, _, hi = token.partition(b":")
+                    wanted.update(range(int(lo), int(hi) + 1) if hi and hi != b"*" else [int(lo)])
+                for seq, message in messages:
+                    uid, raw, _ = message
+                    if uid not in wanted:
+                        continue
+                    if sub == b"STORE":
+                        message[2] = True
+                        self.send(f"* {seq} FETCH (UID {uid} FLAGS (\\Seen))")
+                    elif sub == b"FETCH":
+                        self.fetch(seq, uid, raw, items)
+
+            def fetch(self, seq, uid, raw, items):
+                head, _, body = raw.partition(b"\r\n\r\n")
+                if b"BODYSTRUCTURE" in items.upper():
+                    lines = body.count(b"\n")
+                    self.send(f'* {seq} FETCH (UID {uid} BODYSTRUCTURE ("text" "plain" ("charset" "utf-8") '
+                              f'NIL NIL "7bit" {len(body)} {lines}))')
+                    return
+                fields = _FIELDS_RE.search(items)
+                if fields:
+                    names = {n.lower() for n in fields.group(1).split()}
+                    kept, keep = [], False
+                    for hline in head.split(b"\r\n"):
+                        if hline[:1] not in (b" ", b"\t"):
+                            keep = hline.split(b":", 1)[0].strip().lower() in names
+                        if keep:
+                            kept.append(hline + b"\r\n")
+                    data, name = b"".join(kept) + b"\r\n", "BODY[HEADER.FIELDS (%s)]" % fields.group(1).decode()
+                else:
+                    m = _PARTIAL_RE.search(items)
+                    section = m.group(1).decode() if m else ""
+                    data = raw if not section else body
+                    start, size = (int(m.group(2)), int(m.group(3))) if m and m.group(2) else (0, None)
+                    data = data[start:start + size] if size else data[start:]
+                    name = f"BODY[{section}]" + (f"<{start}>" if size else "")
+                self.send(f"* {seq} FETCH (UID {uid} {name} {{{len(data)}}}".encode() + b"\r\n" + data + b")\r\n")
+
+            def idle(self, box):
+                """Push EXISTS while new mail arrives until the client sends DONE."""
+                self.send("+ idling")
+                self.wfile.flush()
+                seen = self.reported
+                while True:
+                    readable, _, _ = select.select([self.connection], [], [], 0)
+                    if readable:
+                        return bool(self.rfile.readline())  # DONE (or a closed connection)
+                    with box.cond:
+                        if len(box) == seen:
+                            box.cond.wait(0.005)
+                        count = len(box)
+                    if count != seen:
+                        seen = self.reported = count
+                        self.send(f"* {count} EXISTS")
+                        self.wfile.flush()
+
+        self._server = _Server(("127.0.0.1", 0), Handler)
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, name="fake-imap", daemon=True).start()
+        return self
+
+    def close(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+
+class FakeGmail:
+    """A fake SMTP + IMAP pair that answers the campaign like a population of leads.
+
+    Each initial email gets a reply from its lead with probability
+    ``reply_rate``, delivered to the sender's IMAP mailbox ``reply_delay``
+    seconds later. When the auto-reply to it arrives (matched through
+    In-Reply-To), the reply -> auto-reply latency is recorded in
+    ``latencies``.
+    """
+
+    def __init__(self, reply_rate=0.0, reply_delay=0.0, seed=None, **smtp_options):
+        self.reply_rate = reply_rate
+        self.reply_delay = reply_delay
+        self.random = random.Random(seed)
+        self.imap = FakeIMAPServer()
+        self.smtp = FakeSMTPServer(on_message=self._on_message, **smtp_options)
+        self.replies_sent = 0
+        self.latencies = []
+        self._pending = {}    # Message-ID of a fake reply -> time it was delivered
+        self._lock = threading.Lock()
+        self._parser = BytesHeaderParser()
+
+    def start(self):
+        self.imap.start()
+        self.smtp.start()
+        return self
+
+    def close(self):
+        self.smtp.close()
+        self.imap.close()
+
+    def server_settings(self):
+        """Keyword arguments for GmailAutomation(...) pointing at these servers."""
+        return {"smtp_host": "127.0.0.1", "smtp_port": self.smtp.port,
+                "imap_host": "127.0.0.1", "imap_port": self.imap.port, "use_ssl": False}
+
+    def _on_message(self, from_addr, to_addrs, raw):
+        headers = self._parser.parsebytes(raw)
+        in_reply_to = (headers.get("In-Reply-To") or "").strip()
+        if in_reply_to:
+            with self._lock:
+                delivered = self._pending.pop(in_reply_to, None)
+                if delivered is not None:
+                    self.latencies.append(time.monotonic() - delivered)
+            return
+        if not to_addrs or self.random.random() >= self.reply_rate:
+            return
+        reply = self._reply(to_addrs[0], from_addr, headers)
+        if self.reply_delay:
+            threading.Timer(self.reply_delay, self._deliver, (from_addr, reply)).start()
+        else:
+            self._deliver(from_addr, reply)
+
+    def _reply(self, lead, sender, headers):
+        message_id = make_msgid(domain=lead.rpartition("@")[2])
+        original = (headers.get("Message-ID") or "").strip()
+        body = "Thanks, sounds interesting. Tell me more.\r\n\r\n> " + str(headers.get("Subject", ""))
+        head = (f"From: {lead}\r\nTo: {sender}\r\nSubject: Re: {headers.get('Subject', '')}\r\n"
+                f"Message-ID: {message_id}\r\nIn-Reply-To: {original}\r\nReferences: {original}\r\n"
+                "Content-Type: text/plain; charset=utf-8\r\n")
+        return message_id, (head + "\r\n" + body + "\r\n").encode("utf-8")
+
+    def _deliver(self, sender, reply):
+        message_id, raw = reply
+        with self._lock:
+            self._pending[message_id] = time.monotonic()
+            self.replies_sent += 1
+        self.imap.deliver(sender, raw)
@@ -0,0 +1,192 @@
+import ssl
+import time
+import select
+import socket
+import imaplib
+import threading
+
+
+def _buffered(mail):
+    """True if response bytes are already buffered (by SSL or imaplib's reader), where select() can't see them."""
+    pending = getattr(mail.sock, "pending", None)
+    if pending and pending():
+        return True
+    timeout = mail.sock.gettimeout()
+    mail.sock.setblocking(False)
+    try:
+        return bool(mail.file.peek(1))
+    except (BlockingIOError, ssl.SSLWantReadError):
+        return False
+    finally:
+        mail.sock.settimeout(timeout)
+
+
+def open_imap(host="imap.gmail.com", port=None, use_ssl=True, timeout=60):
+    """Connect to an IMAP server; ``use_ssl=False`` is for local test servers.
+
+    ``timeout`` bounds every socket read, so a half-open connection raises
+    instead of blocking until TCP gives up (IDLE waits with select()).
+    """
+    if use_ssl:
+        return imaplib.IMAP4_SSL(host, port or 993, timeout=timeout)
+    return imaplib.IMAP4(host, port or 143, timeout=timeout)
+
+
+class IMAPWatcher:
+    """Long-lived IMAP connection that waits for new mail with IDLE.
+
+    ``connection()`` returns a logged-in IMAP4_SSL with the mailbox selected,
+    reconnecting with exponential backoff when it has dropped. ``wait()``
+    blocks until the server announces new mail, the timeout elapses, the
+    stop event fires or ``wake()`` is called from another thread. Servers
+    without the IDLE capability fall back to sleeping for ``poll_interval``
+    between checks.
+    """
+
+    def __init__(self, user, password, host="imap.gmail.com", mailbox="inbox",
+                 stop_event=None, idle_refresh=9 * 60, poll_interval=10,
+                 max_backoff=300, port=None, use_ssl=True, timeout=60):
+        self.user = user
+        self.password = password
+        self.host = host
+        self.port = port
+        self.use_ssl = use_ssl
+        self.timeout = timeout  # socket read timeout (seconds) for every command
+        self.mailbox = mailbox
+        self.stop_event = stop_event or threading.Event()
+        self.idle_refresh = idle_refresh  # re-issue IDLE before the server's ~10 min cutoff
+        self.poll_interval = poll_interval
+        self.max_backoff = max_backoff
+        self.mail = None
+        self.supports_idle = False
+        self.uidvalidity = None
+        self._backoff = 1
+        # socketpair rather than a pipe so select() also works on Windows
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+
+    # ---------------- connection ----------------
+
+    def _open(self):
+        mail = open_imap(self.host, self.port, self.use_ssl, self.timeout)
+        mail.login(self.user, self.password)
+        status, _ = mail.select(self.mailbox)
+        if status != "OK":
+            raise imaplib.IMAP4.error(f"Cannot select {self.mailbox}")
+        mail.untagged_responses.pop("EXISTS", None)
+        uidvalidity = mail.untagged_responses.pop("UIDVALIDITY", None)
+        self.uidvalidity = int(uidvalidity[-1]) if uidvalidity else 0
+        self.supports_idle = "IDLE" in mail.capabilities
+        return mail
+
+    def connection(self):
+        """Return the live connection, reconnecting with backoff if needed."""
+        while self.mail is None:
+            if self.stop_event.is_set():
+                raise imaplib.IMAP4.abort("watcher stopped")
+            try:
+                self.mail = self._open()
+                self._backoff = 1
+            except Exception as e:
+                print(f"IMAP connect failed, retrying in {self._backoff}s: {e}")
+                self.stop_event.wait(self._backoff)
+                self._backoff = min(self._backoff * 2, self.max_backoff)
+        return self.mail
+
+    def reset(self):
+        """Drop the current connection; the next call to connection() reconnects."""
+        mail, self.mail = self.mail, None
+        if mail is not None:
+            try:
+                mail.logout()
+            except Exception:
+                pass
+
+    def close(self):
+        self.reset()
+
+    def wake(self):
+        """Interrupt a wait() in progress (new follow-up due, stop requested, ...)."""
+        try:
+            self._wake_w.send(b"x")
+        except OSError:
+            pass
+
+    def _drain_wake(self):
+        try:
+            while self._wake_r.recv(64):
+                pass
+        except OSError:
+            pass
+
+    def _sleep(self, timeout):
+        """Sleep until timeout or wake(); returns True if woken."""
+        readable, _, _ = select.select([self._wake_r], [], [], max(0, timeout))
+        if readable:
+            self._drain_wake()
+            return True
+        return False
+
+    # ---------------- waiting ----------------
+
+    def wait(self, timeout):
+        """Block until new mail arrives or ``timeout`` seconds pass.
+
+        Returns True if the server reported new mail.
+        """
+        if self.stop_event.is_set():
+            return False
+        try:
+            mail = self.connection()
+        except Exception:
+            return False
+        # New mail announced while we were running other commands
+        if mail.untagged_responses.pop("EXISTS", None):
+            return True
+        if not self.supports_idle:
+            self._sleep(min(timeout, self.poll_interval))
+            return False
+        try:
+            return self._idle(mail, min(timeout, self.idle_refresh))
+        except Exception as e:
+            print(f"IMAP IDLE failed, reconnecting: {e}")
+            self.reset()
+            return False
+
+    def _idle(self, mail, timeout):
+        tag = mail._new_tag().decode()
+        mail.send(f"{tag} IDLE\r\n".encode())
+        line = mail.readline()
+        if not line.startswith(b"+"):
+            raise imaplib.IMAP4.error(f"IDLE rejected: {line!r}")
+
+        got_mail = False
+        deadline = time.monotonic() + timeout
+        while not self.stop_event.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            if not _buffered(mail):
+                readable, _, _ = select.select([mail.sock, self._wake_r], [], [], remaining)
+                if self._wake_r in readable:
+                    self._drain_wake()
+                    break
+                if not readable:
+                    continue
+            line = mail.readline()
+            if not line:
+                raise imaplib.IMAP4.abort("connection closed during IDLE")
+            if line.startswith(b"*") and b"EXISTS" in line.upper():
+                got_mail = True
+                break
+
+        mail.send(b"DONE\r\n")
+        while True:
+            line = mail.readline()
+            if not line:
+                raise imaplib.IMAP4.abort("connection closed after IDLE")
+            if line.startswith(tag.encode()):
+                break
+            if line.startswith(b"*") and b"EXISTS" in line.upper():
+                got_mail = True
+        return got_mail
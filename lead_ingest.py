@@ -0,0 +1,151 @@
+import os
+import re
+import csv
+import hashlib
+import threading
+from lead_registry import normalize_email
+
+EMAIL_RE = re.compile(r"^[^@\s,;<>]+@[^@\s,;<>]+\.[^@\s,;<>]+$")
+
+
+def _iter_csv(path):
+    """Yield (row, fraction_done) from a CSV file."""
+    size = os.path.getsize(path) or 1
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        reader = csv.reader(f)
+        for row in reader:
+            # tell() is not available while iterating a text file; use the raw buffer position
+            yield row, min(1.0, f.buffer.tell() / size)
+
+
+def _iter_xlsx(path):
+    """Yield (row, fraction_done) from the first sheet, reading it in read-only (streaming) mode."""
+    from openpyxl import load_workbook  # only needed for Excel files
+
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[0]
+        total = ws.max_row or 0
+        for i, row in enumerate(ws.iter_rows(values_only=True), start=1):
+            yield list(row), (i / total if total else 0.0)
+    finally:
+        wb.close()
+
+
+def _iter_xls(path):
+    """Legacy .xls has no streaming reader; fall back to pandas for it."""
+    import pandas as pd
+
+    df = pd.read_excel(path, dtype=str)
+    yield list(df.columns), 0.0
+    total = len(df) or 1
+    for i, row in enumerate(df.itertuples(index=False), start=1):
+        yield list(row), i / total
+
+
+def iter_rows(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        return _iter_csv(path)
+    if ext == ".xls":
+        return _iter_xls(path)
+    return _iter_xlsx(path)
+
+
+class LeadIngestor:
+    """Reads a lead sheet row by row on a background thread.
+
+    Valid, deduplicated (name, email) pairs are handed to ``on_batch`` in
+    batches of ``batch_size`` as soon as they are read, so a campaign can
+    start before the whole file is loaded. ``on_progress(fraction, rows)``
+    reports progress and ``on_done(ingestor, error)`` fires at the end.
+    Duplicates are tracked as 8-byte address hashes rather than strings.
+    """
+
+    def __init__(self, path, on_batch, on_progress=None, on_done=None, batch_size=500):
+        self.path = path
+        self.on_batch = on_batch
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.batch_size = batch_size
+        self.rows = 0
+        self.accepted = 0
+        self.duplicates = 0
+        self.bad_rows = []      # (row number, reason, raw values); first 1000 kept
+        self.bad_count = 0
+        self._seen = set()
+        self._cancelled = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="lead-ingest", daemon=True)
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def join(self, timeout=None):
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _reject(self, row_num, reason, row):
+        self.bad_count += 1
+        if len(self.bad_rows) < 1000:
+            self.bad_rows.append((row_num, reason, row))
+
+    def _run(self):
+        error = None
+        try:
+            self._ingest()
+        except Exception as e:
+            error = e
+        if self.on_done:
+            self.on_done(self, error)
+
+    def _ingest(self):
+        rows = iter_rows(self.path)
+        try:
+            header, _ = next(rows)
+        except StopIteration:
+            raise ValueError("The file is empty.")
+        columns = {str(h).strip().lower(): i for i, h in enumerate(header) if h is not None}
+        if "name" not in columns or "email" not in columns:
+            raise ValueError("Excel must have 'Name' and 'Email' columns.")
+        name_col, email_col = columns["name"], columns["email"]
+
+        batch = []
+        fraction = 0.0
+        for row_num, (row, fraction) in enumerate(rows, start=2):
+            if self._cancelled.is_set():
+                return
+            self.rows += 1
+            if not any(v not in (None, "") for v in row):
+                continue  # blank line
+            name = row[name_col] if name_col < len(row) else None
+            addr = normalize_email(row[email_col] if email_col < len(row) else None)
+            if not addr or addr == "nan":
+                self._reject(row_num, "missing email", row)
+                continue
+            if not EMAIL_RE.match(addr):
+                self._reject(row_num, "invalid email", row)
+                continue
+            digest = hashlib.blake2b(addr.encode("utf-8"), digest_size=8).digest()
+            if digest in self._seen:
+                self.duplicates += 1
+                continue
+            self._seen.add(digest)
+            if name is None or str(name) == "nan":
+                name = ""
+            batch.append((str(name).strip(), addr))
+            if len(batch) >= self.batch_size:
+                self._flush(batch, fraction)
+                batch = []
+        self._flush(batch, 1.0)
+
+    def _flush(self, batch, fraction):
+        if batch:
+            self.accepted += len(batch)
+            self.on_batch(batch)
+        if self.on_progress:
+            self.on_progress(fraction, self.rows)
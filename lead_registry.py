@@ -0,0 +1,85 @@
+def normalize_email(addr):
+    """Canonical form used for lookups: trimmed, without mailto:, case-folded."""
+    addr = str(addr or "").strip()
+    if addr.lower().startswith("mailto:"):
+        addr = addr[7:]
+    return addr.casefold()
+
+
+class Lead:
+    """One lead plus its campaign counters. Unpacks like the old (name, email) tuple."""
+
+    __slots__ = ("name", "email", "sent_at", "last_sent", "reply_count",
+                 "followup_count", "replied_at", "followup_intervals", "account",
+                 "suppressed", "reply_headers")
+
+    def __init__(self, name, email):
+        self.name = name
+        self.email = email
+        self.sent_at = None       # time of the initial email
+        self.last_sent = None     # time of the most recent initial/follow-up
+        self.reply_count = 0      # auto-replies sent
+        self.followup_count = 0
+        self.replied_at = None    # time of the lead's most recent reply
+        self.followup_intervals = None  # per-lead override of the follow-up delays
+        self.account = None       # sender mailbox this lead is pinned to
+        self.suppressed = False   # permanently rejected: never mailed again
+        self.reply_headers = ()   # threading headers for answering the lead's latest reply
+
+    def __iter__(self):
+        yield self.name
+        yield self.email
+
+    def __repr__(self):
+        return f"Lead({self.name!r}, {self.email!r})"
+
+
+class LeadRegistry:
+    """Leads keyed by normalized address for O(1) lookup, deduplicated on load."""
+
+    def __init__(self, leads=()):
+        self._by_email = {}
+        self._order = []     # insertion order, so feeders can pick up only new leads
+        self.duplicates = 0
+        self.load(leads)
+
+    def add(self, name, email):
+        """Register a lead; returns the new Lead, or None if the address is blank or already known."""
+        key = normalize_email(email)
+        if not key:
+            return None
+        if key in self._by_email:
+            self.duplicates += 1
+            return None
+        name = "" if name is None else str(name).strip()
+        lead = Lead(name, key)
+        self._by_email[key] = lead
+        self._order.append(lead)
+        return lead
+
+    def load(self, leads):
+        """Add (name, email) pairs; returns the number of new leads."""
+        added = 0
+        for name, email in leads:
+            if self.add(name, email) is not None:
+                added += 1
+        return added
+
+    def since(self, position):
+        """Leads added after the first ``position`` ones."""
+        return self._order[position:]
+
+    def get(self, email):
+        return self._by_email.get(normalize_email(email))
+
+    def __contains__(self, email):
+        return normalize_email(email) in self._by_email
+
+    def __iter__(self):
+        return iter(self._order[:])
+
+    def __len__(self):
+        return len(self._by_email)
+
+    def __bool__(self):
+        return bool(self._by_email)
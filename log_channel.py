@@ -0,0 +1,38 @@
+import queue
+import logging
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+
+class LogChannel:
+    """Thread-safe hand-off of log lines from worker threads to the UI.
+
+    ``post()`` may be called from any thread: the line is appended to a
+    rotating log file right away (full history) and queued for the UI,
+    which takes whole batches with ``drain()`` on its own thread.
+    """
+
+    def __init__(self, log_file="automation.log", max_bytes=5 * 1024 * 1024, backup_count=3):
+        self._queue = queue.SimpleQueue()
+        self.logger = logging.getLogger("gmail_automation")
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+        if log_file and not self.logger.handlers:
+            handler = RotatingFileHandler(log_file, maxBytes=max_bytes,
+                                          backupCount=backup_count, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(asctime)s  %(message)s"))
+            self.logger.addHandler(handler)
+
+    def post(self, text, tag=None):
+        self._queue.put((datetime.now().strftime("%H:%M:%S"), text, tag))
+        self.logger.info(text)
+
+    def drain(self, limit=5000):
+        """Return up to ``limit`` queued (timestamp, text, tag) entries without blocking."""
+        items = []
+        try:
+            while len(items) < limit:
+                items.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return items
@@ -0,0 +1,258 @@
+import os
+import sys
+import json
+import time
+import signal
+import socket
+import logging
+import argparse
+import threading
+import socketserver
+from logging.handlers import RotatingFileHandler
+from automation import GmailAutomation
+from lead_ingest import LeadIngestor
+from metrics import MetricsServer
+
+# Headless runner: the same engine as main_gui.py without tkinter or pandas.
+#
+#   python main_cli.py run --config campaign.json
+#   python main_cli.py status campaign/status.sock
+#   python main_cli.py status campaign/status.sock profile 30   # dump hot paths
+#
+# campaign.json (every key optional; relative paths are resolved against the file):
+#   {"accounts": [{"user": "me@gmail.com", "password_env": "ME_APP_PASSWORD"}],
+#    "leads": "leads.xlsx", "messages": "messages.json", "data_dir": "campaign",
+#    "status_socket": "campaign/status.sock", "metrics_address": "127.0.0.1:9464",
+#    "followup_intervals": [86400, 259200],
+#    "followup_limit": 4, "auto_reply_limit": 4, "send_workers": 4,
+#    "smtp_host": "smtp.gmail.com", "smtp_port": 465, "imap_host": "imap.gmail.com",
+#    "imap_port": 993, "use_ssl": true}
+# GMAIL_USER / GMAIL_APP_PASSWORD add one more account from the environment.
+# metrics_address serves Prometheus metrics at http://<address>/metrics; SIGUSR1
+# (or the "profile" status command) samples the engine and writes profile-*.folded.
+
+SERVERS = ("smtp_host", "smtp_port", "imap_host", "imap_port", "use_ssl")
+SETTINGS = ("followup_interval", "followup_intervals", "followup_limit", "auto_reply_limit",
+            "send_workers", "account_per_minute", "account_per_day")
+
+
+def load_config(path):
+    if not path:
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    base = os.path.dirname(os.path.abspath(path))
+    for key in ("leads", "messages", "data_dir", "status_socket"):
+        value = config.get(key)
+        if value and not (key == "status_socket" and _parse_address(value)[0] == socket.AF_INET):
+            config[key] = os.path.join(base, value)
+    return config
+
+
+def config_accounts(config):
+    """[(user, password, per_minute, per_day)] from the config file and the environment."""
+    accounts = []
+    for entry in config.get("accounts", []):
+        password = entry.get("password") or os.environ.get(entry.get("password_env", ""), "")
+        accounts.append((entry["user"], password, entry.get("per_minute"), entry.get("per_day")))
+    if os.environ.get("GMAIL_USER"):
+        accounts.append((os.environ["GMAIL_USER"], os.environ.get("GMAIL_APP_PASSWORD", ""), None, None))
+    return accounts
+
+
+def setup_logging(data_dir):
+    logger = logging.getLogger("gmail_automation")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    formatter = logging.Formatter("%(asctime)s  %(message)s")
+    for handler in (logging.StreamHandler(sys.stderr),
+                    RotatingFileHandler(os.path.join(data_dir, "automation.log"),
+                                        maxBytes=5 * 1024 * 1024, backupCount=3, encoding="utf-8")):
+        handler.setFormatter(formatter)
+        logger.addHandler(handler)
+    return logger
+
+
+def _parse_address(address):
+    """"host:port" -> TCP address, anything else is a Unix socket path."""
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit():
+        return socket.AF_INET, (host or "127.0.0.1", int(port))
+    return socket.AF_UNIX, address
+
+
+class StatusServer:
+    """Local socket that answers one JSON line per connection.
+
+    A client sends ``status`` (the default on an empty line) or ``health``
+    and gets the campaign snapshot, or {"ok": ...}, back. ``profile [seconds]``
+    samples the engine (10 s by default) and answers with the dump's path
+    and the hottest functions.
+    """
+
+    def __init__(self, bot, address):
+        self.bot = bot
+        self.family, self.address = _parse_address(address)
+        self._server = None
+
+    def start(self):
+        bot = self.bot
+
+        class Handler(socketserver.StreamRequestHandler):
+            timeout = 2
+
+            def handle(self):
+                try:
+                    command = self.rfile.readline(100).decode(errors="ignore").strip() or "status"
+                except OSError:
+                    command = "status"
+                command, _, argument = command.partition(" ")
+                if command == "health":
+                    ok = bot.running and any(a.healthy() for a in bot.accounts)
+                    reply = {"ok": ok}
+                elif command == "status":
+                    reply = bot.status()
+                elif command == "profile":
+                    seconds = float(argument) if argument.replace(".", "", 1).isdigit() else 10
+                    path, report = bot.profile(min(seconds, 300))
+                    reply = {"path": path, "report": report}
+                else:
+                    reply = {"error": f"unknown command {command!r}"}
+                self.wfile.write(json.dumps(reply).encode("utf-8") + b"\n")
+
+        if self.family == socket.AF_UNIX:
+            if os.path.exists(self.address):
+                os.remove(self.address)  # left over from an unclean exit
+            server_class = socketserver.ThreadingUnixStreamServer
+        else:
+            server_class = socketserver.ThreadingTCPServer
+        self._server = server_class(self.address, Handler)
+        self._server.daemon_threads = True
+        if self.family == socket.AF_UNIX:
+            os.chmod(self.address, 0o600)
+        threading.Thread(target=self._server.serve_forever, name="status-socket", daemon=True).start()
+        return self
+
+    def close(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            if self.family == socket.AF_UNIX and os.path.exists(self.address):
+                os.remove(self.address)
+
+
+def query_status(address, command="status", timeout=5):
+    family, address = _parse_address(address)
+    with socket.socket(family, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(address)
+        sock.sendall(command.encode() + b"\n")
+        data = b""
+        while not data.endswith(b"\n"):
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            data += chunk
+    return json.loads(data)
+
+
+def run(args):
+    config = load_config(args.config)
+    for key in ("leads", "messages", "data_dir", "status_socket", "metrics_address"):
+        if getattr(args, key):
+            config[key] = getattr(args, key)
+    data_dir = config.get("data_dir") or "."
+    os.makedirs(data_dir, exist_ok=True)
+    logger = setup_logging(data_dir)
+
+    servers = {key: config[key] for key in SERVERS if key in config}
+    bot = GmailAutomation(config.get("messages") or "messages.json", data_dir, **servers)
+    if config.get("messages") and bot.templates.error:
+        logger.info(f"❌ {bot.templates.error}")
+        return 2
+    for key in SETTINGS:
+        if key in config:
+            setattr(bot, key, config[key])
+    for user, password, per_minute, per_day in config_accounts(config):
+        bot.add_account(user, password, per_minute, per_day)
+    if not len(bot.accounts):
+        logger.info("❌ No sender account configured (config \"accounts\" or GMAIL_USER).")
+        return 2
+
+    stop = threading.Event()
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    if hasattr(signal, "SIGHUP"):
+        signal.signal(signal.SIGHUP, lambda *_: bot.templates.reload())
+    if hasattr(signal, "SIGUSR1"):
+        def profile(*_):
+            def run_profile():
+                path, report = bot.profile(30)
+                logger.info(f"🔥 Profile written to {path}\n{report}")
+            threading.Thread(target=run_profile, name="profile", daemon=True).start()
+
+        signal.signal(signal.SIGUSR1, profile)
+
+    server = StatusServer(bot, config["status_socket"]).start() if config.get("status_socket") else None
+    metrics_server = None
+    if config.get("metrics_address"):
+        host, _, port = config["metrics_address"].rpartition(":")
+        metrics_server = MetricsServer(bot.metrics, host or "127.0.0.1", int(port)).start()
+
+    if config.get("leads"):
+        def on_done(ingestor, error):
+            if error:
+                logger.info(f"❌ Failed to load leads: {error}")
+            else:
+                logger.info(f"📥 Loaded {ingestor.accepted} leads ({ingestor.duplicates} duplicates, "
+                            f"{ingestor.bad_count} bad rows)")
+            bot.leads_complete.set()
+
+        bot.leads_complete.clear()
+        LeadIngestor(config["leads"], bot.add_leads, on_done=on_done).start()
+
+    bot.start(log_callback=logger.info)
+    started = time.monotonic()
+    while not stop.wait(1):
+        if not bot.running:
+            break  # every account failed to log in
+    failed = not bot.running and not stop.is_set()
+    if server:
+        server.close()
+    if metrics_server:
+        metrics_server.close()
+    bot.close()
+    logger.info(f"🛑 Stopped after {time.monotonic() - started:.0f}s.")
+    return 1 if failed else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the Gmail automation engine without the GUI.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("run", help="run a campaign until SIGINT/SIGTERM (SIGHUP reloads templates)")
+    p.add_argument("--config", help="JSON config file")
+    p.add_argument("--leads", help="lead file (.csv, .xlsx or .xls)")
+    p.add_argument("--messages", help="templates file (default messages.json)")
+    p.add_argument("--data-dir", dest="data_dir", help="where campaign state and logs are kept")
+    p.add_argument("--status-socket", dest="status_socket", help="Unix socket path or host:port")
+    p.add_argument("--metrics-address", dest="metrics_address",
+                   help="host:port to serve Prometheus metrics on (/metrics)")
+    p = sub.add_parser("status", help="query a running campaign")
+    p.add_argument("address", help="its status socket")
+    p.add_argument("what", nargs="?", default="status", choices=("status", "health", "profile"))
+    p.add_argument("seconds", nargs="?", type=float, default=10, help="profile duration")
+    args = parser.parse_args(argv)
+
+    if args.command == "status":
+        if args.what == "profile":
+            reply = query_status(args.address, f"profile {args.seconds:g}", timeout=args.seconds + 30)
+            print(f"{reply['report']}\n\nCollapsed stacks: {reply['path']}")
+            return 0
+        reply = query_status(args.address, args.what)
+        print(json.dumps(reply, indent=2, ensure_ascii=False))
+        return 0 if reply.get("ok", True) else 1
+    return run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,15 @@
 import os
 import sys
 import platform
+import threading
 import subprocess
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 from tkinter.scrolledtext import ScrolledText
-import pandas as pd
-from datetime import datetime
+import queue
 from automation import GmailAutomation
+from lead_ingest import LeadIngestor
+from log_channel import LogChannel
 
 
 
@@ -23,12 +25,16 @@ DANGER = "#ef4444"       # red-500"
 HEADER_LEFT = "#0ea5e9"  # sky-500
 HEADER_RIGHT = "#6366f1" # indigo-500
 
+LOG_MAX_LINES = 2000     # lines kept in the log box; full history goes to automation.log
+LOG_DRAIN_MS = 100       # how often queued log lines are flushed into the widget
+STATS_REFRESH_MS = 1000  # how often the live stats panel is redrawn
+
 
 class GmailBotGUI(tk.Tk):
     def __init__(self):
         super().__init__()
         self.title("Gmail Automation System")
-        self.geometry("900x650")
+        self.geometry("900x820")
         self.configure(bg=DARK_BG)
 
         # Core objects
@@ -37,6 +43,12 @@ class GmailBotGUI(tk.Tk):
         self.app_password = tk.StringVar()
         self.excel_path = tk.StringVar()
         self.lead_count_var = tk.StringVar(value="0")
+        self.ingestor = None
+        self._ingest_events = queue.Queue()
+        self._profiling = False
+        self._stopping = False   # stop() runs on a worker thread; see stop_automation
+        self._stopped = False
+        self.log_channel = LogChannel("automation.log")
 
         # ttk theme + styles
         style = ttk.Style(self)
@@ -77,6 +89,8 @@ class GmailBotGUI(tk.Tk):
         )
 
         self._build_ui()
+        self.after(LOG_DRAIN_MS, self._drain_logs)
+        self.after(STATS_REFRESH_MS, self._refresh_stats)
 
     # ---------------- UI BUILD ----------------
 
@@ -153,6 +167,20 @@ class GmailBotGUI(tk.Tk):
         self.log_box.pack(fill="both", expand=True, padx=6, pady=6)
         self._init_log_tags()
 
+        # --- Live stats card ---
+        stats_card = ttk.Labelframe(grid, text="Live Stats", style="Card.TLabelframe")
+        stats_card.grid(row=2, column=0, columnspan=2, sticky="nsew", pady=(16, 0))
+        self.stats_queues = tk.Label(stats_card, text="", bg=CARD_BG, fg=TEXT, font=("Consolas", 9),
+                                     justify="left", anchor="nw")
+        self.stats_queues.grid(row=0, column=0, padx=8, pady=4, sticky="nw")
+        self.stats_stages = tk.Label(stats_card, text="", bg=CARD_BG, fg=TEXT, font=("Consolas", 9),
+                                     justify="left", anchor="nw")
+        self.stats_stages.grid(row=0, column=1, padx=16, pady=4, sticky="nw")
+        self.profile_button = ttk.Button(stats_card, text="🔥 Profile 10s", style="Ghost.TButton",
+                                         command=self.profile_engine)
+        self.profile_button.grid(row=0, column=2, padx=8, pady=4, sticky="ne")
+        stats_card.columnconfigure(1, weight=1)
+
         # Grid weights
         grid.columnconfigure(0, weight=1)
         grid.columnconfigure(1, weight=1)
@@ -229,7 +257,9 @@ class GmailBotGUI(tk.Tk):
     # --------------- IO + LOGGING ----------------
 
     def browse_excel(self):
-        path = filedialog.askopenfilename(filetypes=[("Excel Files", "*.xlsx;*.xls")])
+        path = filedialog.askopenfilename(filetypes=[("Lead Files", "*.xlsx;*.xls;*.csv"),
+                                                     ("Excel Files", "*.xlsx;*.xls"),
+                                                     ("CSV Files", "*.csv")])
         if path:
             self.excel_path.set(path)
             self.status.config(text=f"Selected: {os.path.basename(path)}")
@@ -241,18 +271,65 @@ class GmailBotGUI(tk.Tk):
             messagebox.showwarning("Warning", "You cannot load a new Excel file during automation.\nStop the automation first.")
             return
 
+        if self.ingestor is not None:
+            self.log("⚠️ Leads are still loading. Please wait for the current file to finish.", "warn")
+            return
+
+        path = self.excel_path.get()
+        if not os.path.exists(path):
+            messagebox.showerror("Error", f"Failed to load Excel: file not found\n{path}")
+            return
+
+        # Stream the file on a worker thread; batches become available to the bot as they are read
+        self.bot.leads = []
+        self.bot.leads_complete.clear()
+        self.lead_count_var.set("0")
+        self.status.config(text=f"Loading {os.path.basename(path)}…")
+        events = self._ingest_events
+        self.ingestor = LeadIngestor(
+            path,
+            on_batch=self.bot.add_leads,
+            on_progress=lambda fraction, rows: events.put(("progress", fraction, rows)),
+            on_done=lambda ingestor, error: events.put(("done", ingestor, error)),
+        ).start()
+        self.after(100, self._poll_ingest)
+
+    def _poll_ingest(self):
+        """Apply ingestion updates on the Tk thread."""
+        done = None
         try:
-            df = pd.read_excel(self.excel_path.get())
-            if not {'Name', 'Email'}.issubset(df.columns):
-                messagebox.showerror("Error", "Excel must have 'Name' and 'Email' columns.")
-                return
-            self.bot.leads = list(zip(df['Name'], df['Email']))
-            self.lead_count_var.set(str(len(self.bot.leads)))
-            self.log("✅ Loaded leads from Excel.", "ok")
-            self.status.config(text=f"Loaded {len(self.bot.leads)} leads.")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to load Excel: {e}")
-            self.log(f"Error loading Excel: {e}", "err")
+            while True:
+                event = self._ingest_events.get_nowait()
+                if event[0] == "progress":
+                    _, fraction, rows = event
+                    self.lead_count_var.set(str(len(self.bot.leads)))
+                    self.status.config(text=f"Loading leads… {fraction:.0%} ({rows} rows read)")
+                else:
+                    done = event
+        except queue.Empty:
+            pass
+
+        if done is None:
+            self.after(100, self._poll_ingest)
+            return
+
+        _, ingestor, error = done
+        self.ingestor = None
+        self.bot.leads_complete.set()
+        self.lead_count_var.set(str(len(self.bot.leads)))
+        if error is not None:
+            messagebox.showerror("Error", f"Failed to load Excel: {error}")
+            self.log(f"Error loading Excel: {error}", "err")
+            self.status.config(text="Failed to load leads.")
+            return
+        self.log(f"✅ Loaded {ingestor.accepted} leads from {os.path.basename(ingestor.path)}.", "ok")
+        if ingestor.duplicates:
+            self.log(f"⚠️ Skipped {ingestor.duplicates} duplicate rows.", "warn")
+        if ingestor.bad_count:
+            self.log(f"⚠️ Skipped {ingestor.bad_count} invalid rows:", "warn")
+            for row_num, reason, row in ingestor.bad_rows[:5]:
+                self.log(f"   row {row_num}: {reason} {row}", "warn")
+        self.status.config(text=f"Loaded {len(self.bot.leads)} leads.")
 
 
     def clear_logs(self):
@@ -260,15 +337,84 @@ class GmailBotGUI(tk.Tk):
         self.status.config(text="Logs cleared.")
 
     def log(self, text: str, tag: str | None = None):
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        the_tag = tag or self._tag_for_message(text)
-        self.log_box.insert("end", f"{timestamp}  ", ("time",))
-        self.log_box.insert("end", text + "\n", (the_tag,))
-        self.log_box.see("end")
+        """Safe to call from any thread; the line shows up on the next drain."""
+        self.log_channel.post(text, tag)
+
+    def _drain_logs(self):
+        """Insert all queued log lines in one widget update and trim the box to LOG_MAX_LINES."""
+        entries = self.log_channel.drain()
+        if entries:
+            entries = entries[-LOG_MAX_LINES:]
+            chunks = []
+            for timestamp, text, tag in entries:
+                chunks += [f"{timestamp}  ", ("time",), text + "\n", (tag or self._tag_for_message(text),)]
+            self.log_box.insert("end", *chunks)
+            lines = int(self.log_box.index("end-1c").split(".")[0]) - 1  # trailing newline
+            if lines > LOG_MAX_LINES:
+                self.log_box.delete("1.0", f"{lines - LOG_MAX_LINES + 1}.0")
+            self.log_box.see("end")
+        self.after(LOG_DRAIN_MS, self._drain_logs)
+
+    def _refresh_stats(self):
+        """Redraw the live stats panel from the engine's counters (cheap, no database reads)."""
+        metrics = self.bot.metrics
+        gauges = metrics.gauges()
+
+        def value(name):
+            values = gauges.get(name)
+            return values[0][1] if values else 0
+
+        lines = [
+            f"Initial queued   {value('initial_queued')}",
+            f"Replies queued   {value('replies_queued')}",
+            f"Follow-ups due   {value('followups_pending')}",
+            f"Retries pending  {value('retries_pending')}",
+            f"Suppressed       {value('suppressed')}",
+            f"Send rate        {value('send_rate_factor'):.0%}",
+        ]
+        sessions = {labels["state"]: n for labels, n in gauges.get("smtp_sessions", [])}
+        if sessions:
+            lines.append(f"SMTP sessions    {sessions.get('in_use', 0)} busy / {sessions.get('open', 0)} open")
+        quotas = {labels["account"]: quota for labels, quota in gauges.get("account_per_day", [])}
+        for labels, sent in gauges.get("account_sent_24h", []):
+            account = labels["account"]
+            lines.append(f"{account[:24]:<24} {sent}/{quotas.get(account) or '∞'} today")
+        self.stats_queues.config(text="\n".join(lines))
+        if not self._profiling:
+            self.profile_button.state(["!disabled"])
+        if self._stopped:
+            self._stopped = False
+            self.status.config(text="Stopped.")
+
+        stages = sorted(metrics.stages().items(), key=lambda item: -item[1]["count"] * item[1]["avg_ms"])
+        rows = [f"{'stage':<16}{'count':>8}{'avg ms':>9}{'p95 ms':>9}{'errors':>8}"]
+        for stage, s in stages[:10]:
+            p95 = "-" if s["p95_ms"] is None else f"≤{s['p95_ms']:g}"
+            rows.append(f"{stage:<16}{s['count']:>8}{s['avg_ms']:>9.1f}{p95:>9}{s['errors']:>8}")
+        self.stats_stages.config(text="\n".join(rows))
+        self.after(STATS_REFRESH_MS, self._refresh_stats)
+
+    def profile_engine(self):
+        """Sample the engine for 10 seconds on a worker thread and log the hot paths."""
+        self.profile_button.state(["disabled"])
+        self._profiling = True
+
+        def run():
+            path, report = self.bot.profile(10)
+            self.log(f"🔥 Profile written to {os.path.abspath(path)}", "info")
+            for line in report.splitlines()[:12]:
+                self.log(line, "info")
+            self._profiling = False  # the stats refresh re-enables the button
+
+        threading.Thread(target=run, name="profile", daemon=True).start()
+        self.log("🔥 Profiling the engine for 10 seconds…", "info")
 
     # --------------- AUTOMATION CONTROLS ----------------
 
     def start_automation(self):
+        if self._stopping:
+            self.log("⚠️ Still stopping the previous run, try again in a moment.", "warn")
+            return
         if not self.bot.leads:
             messagebox.showwarning("No Leads", "Please load leads from Excel first.")
             self.log("No leads loaded.", "warn")
@@ -283,9 +429,19 @@ class GmailBotGUI(tk.Tk):
         self.status.config(text="Running… listening for replies and scheduling follow-ups.")
 
     def stop_automation(self):
-        self.bot.stop()
-        self.log("🛑 Automation stopped.", "info")
-        self.status.config(text="Stopped.")
+        """Stop on a worker thread: stop() waits for sends and IMAP reads in flight, which can take a while."""
+        if self._stopping:
+            return
+        self._stopping = True
+        self.status.config(text="Stopping… finishing the sends in flight.")
+
+        def run():
+            self.bot.stop()
+            self.log("🛑 Automation stopped.", "info")
+            self._stopping = False
+            self._stopped = True  # the stats refresh updates the status line
+
+        threading.Thread(target=run, name="stop", daemon=True).start()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,51 @@
+import threading
+from email.utils import make_msgid
+
+
+class MessageIndex:
+    """Message-ID -> (lead email, kind, step) for every message the campaign sent.
+
+    Replies are matched to what they answer through In-Reply-To/References
+    with a dict lookup. Every entry is also written to the campaign store,
+    so IDs sent before a restart are found there on a miss and cached.
+    """
+
+    def __init__(self, store=None):
+        self.store = store
+        self._ids = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def new_id(from_addr):
+        """A fresh Message-ID on the sender's domain (avoids make_msgid's hostname lookup)."""
+        domain = from_addr.rpartition("@")[2] or "localhost"
+        return make_msgid(domain=domain)
+
+    def add(self, message_id, email_addr, kind, step=0, ts=None):
+        with self._lock:
+            self._ids[message_id] = (email_addr, kind, step)
+        if self.store is not None:
+            self.store.record_message(message_id, email_addr, kind, step, ts)
+
+    def resolve(self, message_ids):
+        """(email, kind, step) of the first ID in ``message_ids`` that we sent, else None."""
+        message_ids = [m for m in message_ids if m]
+        missing = []
+        with self._lock:
+            for message_id in message_ids:
+                found = self._ids.get(message_id)
+                if found:
+                    return found
+                missing.append(message_id)
+        if self.store is None or not missing:
+            return None
+        found = self.store.find_message(missing)
+        if found:
+            message_id, entry = found
+            with self._lock:
+                self._ids[message_id] = entry
+            return entry
+        return None
+
+    def __len__(self):
+        return len(self._ids)
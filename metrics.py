@@ -0,0 +1,280 @@
+import sys
+import time
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Latency buckets (seconds) for the stage histograms: 1 ms .. 1 min
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+HELP = {
+    "stage_seconds": "Time spent in each stage of the engine.",
+    "errors_total": "Exceptions caught per stage.",
+    "emails_total": "Send attempts by template kind and outcome.",
+    "messages_received_total": "Incoming messages for leads by kind (reply, auto, bounce).",
+}
+
+
+def _label_text(labels):
+    if not labels:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, v in labels)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(labels, escaped)) + "}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram as Prometheus expects it."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)   # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        i = 0
+        while i < len(self.buckets) and value > self.buckets[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the ``q`` quantile (None if empty)."""
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class Metrics:
+    """Counters, stage latency histograms and gauges, rendered in the Prometheus text format.
+
+    ``time(stage)`` wraps a block and records its wall time under
+    ``stage_seconds{stage=...}`` (and counts it in ``errors_total`` if it
+    raises). Gauges are callbacks read at render time, returning a number
+    or [(labels dict, number)].
+    """
+
+    def __init__(self, prefix="gmail_automation", buckets=BUCKETS):
+        self.prefix = prefix
+        self.buckets = buckets
+        self._counters = {}     # (name, labels) -> value
+        self._histograms = {}   # (name, labels) -> Histogram
+        self._gauges = {}       # name -> (help, func)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def inc(self, name, amount=1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    @contextmanager
+    def time(self, stage):
+        started = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.inc("errors_total", stage=stage)
+            raise
+        finally:
+            self.observe("stage_seconds", time.perf_counter() - started, stage=stage)
+
+    def gauge(self, name, func, help_text=""):
+        self._gauges[name] = (help_text, func)
+
+    def _read_gauges(self):
+        values = {}
+        for name, (_, func) in list(self._gauges.items()):
+            try:
+                value = func()
+            except Exception as e:
+                print(f"Error reading gauge {name}: {e}")
+                continue
+            if value is None:
+                continue
+            if isinstance(value, (int, float)):
+                value = [({}, value)]
+            values[name] = [(tuple(sorted(labels.items())), v) for labels, v in value]
+        return values
+
+    def render(self):
+        """The whole registry in the Prometheus text exposition format."""
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: (list(h.counts), h.count, h.sum) for key, h in self._histograms.items()}
+        lines = []
+
+        def header(name, kind, help_text):
+            if help_text:
+                lines.append(f"# HELP {self.prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {self.prefix}_{name} {kind}")
+
+        for name in sorted({name for name, _ in counters}):
+            header(name, "counter", HELP.get(name))
+            for (n, labels), value in sorted(counters.items()):
+                if n == name:
+                    lines.append(f"{self.prefix}_{name}{_label_text(labels)} {value}")
+        for name in sorted({name for name, _ in histograms}):
+            header(name, "histogram", HELP.get(name))
+            for (n, labels), (counts, count, total) in sorted(histograms.items()):
+                if n != name:
+                    continue
+                cumulative = 0
+                for bound, c in zip((*self.buckets, "+Inf"), counts):
+                    cumulative += c
+                    lines.append(f"{self.prefix}_{name}_bucket{_label_text((*labels, ('le', bound)))} {cumulative}")
+                lines.append(f"{self.prefix}_{name}_sum{_label_text(labels)} {total:.6f}")
+                lines.append(f"{self.prefix}_{name}_count{_label_text(labels)} {count}")
+        for name, values in sorted(self._read_gauges().items()):
+            header(name, "gauge", self._gauges[name][0])
+            for labels, value in values:
+                lines.append(f"{self.prefix}_{name}{_label_text(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def gauges(self):
+        """{name: [(labels dict, value)]} read from every gauge callback now."""
+        return {name: [(dict(labels), v) for labels, v in values]
+                for name, values in self._read_gauges().items()}
+
+    def stages(self):
+        """{stage: {"count", "avg_ms", "p95_ms", "errors"}} for status displays."""
+        with self._lock:
+            result = {}
+            for (name, labels), h in self._histograms.items():
+                if name != "stage_seconds" or not h.count:
+                    continue
+                stage = dict(labels)["stage"]
+                p95 = h.quantile(0.95)
+                result[stage] = {
+                    "count": h.count,
+                    "avg_ms": round(h.sum / h.count * 1000, 2),
+                    "p95_ms": None if p95 == float("inf") else p95 * 1000,
+                    "errors": self._counters.get(("errors_total", (("stage", stage),)), 0),
+                }
+            return result
+
+
+class MetricsServer:
+    """Serves ``metrics.render()`` at http://host:port/metrics for Prometheus to scrape."""
+
+    def __init__(self, metrics, host="127.0.0.1", port=9464):
+        self.metrics = metrics
+        self.address = (host, port)
+        self._server = None
+
+    def start(self):
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass  # scrapes every few seconds would flood the log
+
+        self._server = ThreadingHTTPServer(self.address, Handler)
+        self._server.daemon_threads = True
+        self.address = self._server.server_address
+        threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+        return self
+
+    def close(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+
+class SamplingProfiler:
+    """Opt-in statistical profiler: samples every thread's stack every ``interval`` seconds.
+
+    Costs nothing until started. ``report()`` lists the hottest functions
+    (by samples where they were running, and where they were on the stack);
+    ``dump(path)`` writes collapsed stacks ("a;b;c count" lines) that
+    flamegraph.pl or speedscope can draw. Threads in ``exclude`` (idents)
+    are not sampled.
+    """
+
+    def __init__(self, interval=0.005, exclude=()):
+        self.interval = interval
+        self.exclude = set(exclude)
+        self.samples = 0
+        self._stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def _frame_name(frame):
+        code = frame.f_code
+        return f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno})"
+
+    def _run(self):
+        me = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            names.update((t.ident, t.name) for t in threading.enumerate())
+            for ident, frame in sys._current_frames().items():
+                if ident == me or ident in self.exclude:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(self._frame_name(frame))
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self._stacks[tuple(reversed(stack))] += 1
+            self.samples += 1
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def report(self, top=25):
+        own, total = Counter(), Counter()
+        for stack, n in self._stacks.items():
+            own[stack[-1]] += n
+            for name in set(stack[1:]):
+                total[name] += n
+        samples = sum(self._stacks.values()) or 1
+        lines = [f"{self.samples} samples every {self.interval * 1000:g} ms", "", "Hottest (running):"]
+        lines += [f"  {n / samples:6.1%}  {name}" for name, n in own.most_common(top)]
+        lines += ["", "Hottest (on the stack):"]
+        lines += [f"  {n / samples:6.1%}  {name}" for name, n in total.most_common(top)]
+        return "\n".join(lines)
+
+    def dump(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, n in self._stacks.most_common():
+                f.write(";".join(stack) + f" {n}\n")
+        return path
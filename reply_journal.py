@@ -0,0 +1,177 @@
+import os
+import json
+import time
+import threading
+
+
+class ReplyJournal:
+    """Append-only JSONL store for replies, split into rotating segments.
+
+    Each reply is one line in ``replies-NNNNNN.jsonl``. A compact index
+    (``index.jsonl``: sender, timestamp, segment, offset) sits next to the
+    segments so replies can be filtered and paged without reading every
+    body. Writes are flushed immediately and fsynced in batches, either every
+    ``fsync_every`` entries or every ``fsync_interval`` seconds.
+    """
+
+    def __init__(self, directory="replies", segment_size=8 * 1024 * 1024,
+                 fsync_every=20, fsync_interval=1.0):
+        self.directory = directory
+        self.segment_size = segment_size
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._last_sync = time.monotonic()
+        os.makedirs(directory, exist_ok=True)
+
+        self._segment = max(self._segments(), default=1)
+        self._data = open(self._segment_path(self._segment), "ab")
+        self._index = open(os.path.join(directory, "index.jsonl"), "ab")
+        self._recover_index()
+
+    # ---------------- files ----------------
+
+    def _segment_path(self, segment):
+        return os.path.join(self.directory, f"replies-{segment:06d}.jsonl")
+
+    def _segments(self):
+        found = []
+        for name in os.listdir(self.directory):
+            if name.startswith("replies-") and name.endswith(".jsonl"):
+                try:
+                    found.append(int(name[8:-6]))
+                except ValueError:
+                    pass
+        return sorted(found)
+
+    def _iter_index(self):
+        path = os.path.join(self.directory, "index.jsonl")
+        if not os.path.exists(path):
+            return
+        with open(path, "rb") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue  # torn write from a crash
+
+    def _recover_index(self):
+        """Index any lines that reached the data segment but not the index before a crash."""
+        last_offset = -1
+        for sender, ts, segment, offset in self._iter_index():
+            if segment == self._segment:
+                last_offset = max(last_offset, offset)
+        with open(self._segment_path(self._segment), "rb") as f:
+            if last_offset >= 0:
+                f.seek(last_offset)
+                f.readline()
+            while True:
+                offset = f.tell()
+                line = f.readline()
+                if not line:
+                    break
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                self._write_index(entry, self._segment, offset)
+        self._index.flush()
+
+    def _write_index(self, entry, segment, offset):
+        row = [entry.get("sender", ""), entry.get("ts", 0), segment, offset]
+        self._index.write((json.dumps(row) + "\n").encode("utf-8"))
+
+    def _rotate(self):
+        self._sync()
+        self._data.close()
+        self._segment += 1
+        self._data = open(self._segment_path(self._segment), "ab")
+
+    def _sync(self):
+        self._data.flush()
+        self._index.flush()
+        os.fsync(self._data.fileno())
+        os.fsync(self._index.fileno())
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    # ---------------- writing ----------------
+
+    def append(self, entry):
+        """Append one reply. ``entry`` gets a numeric ``ts`` if it has none."""
+        entry.setdefault("ts", time.time())
+        line = (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock:
+            if self._data.tell() and self._data.tell() + len(line) > self.segment_size:
+                self._rotate()
+            offset = self._data.tell()
+            self._data.write(line)
+            self._data.flush()
+            self._write_index(entry, self._segment, offset)
+            self._index.flush()
+            self._pending += 1
+            if (self._pending >= self.fsync_every
+                    or time.monotonic() - self._last_sync >= self.fsync_interval):
+                self._sync()
+
+    def flush(self):
+        with self._lock:
+            if self._pending:
+                self._sync()
+
+    def close(self):
+        with self._lock:
+            self._sync()
+            self._data.close()
+            self._index.close()
+
+    # ---------------- reading ----------------
+
+    def query(self, sender=None, since=None, until=None, offset=0, limit=50, newest_first=True):
+        """Return one page of replies matching the filters, using only the index to select them."""
+        with self._lock:
+            self._data.flush()
+            self._index.flush()
+        rows = [
+            row for row in self._iter_index()
+            if (sender is None or row[0] == sender)
+            and (since is None or row[1] >= since)
+            and (until is None or row[1] < until)
+        ]
+        if newest_first:
+            rows.reverse()
+        return [self._read(segment, pos) for _, _, segment, pos in rows[offset:offset + limit]]
+
+    def count(self, sender=None):
+        return sum(1 for row in self._iter_index() if sender is None or row[0] == sender)
+
+    def _read(self, segment, offset):
+        with open(self._segment_path(segment), "rb") as f:
+            f.seek(offset)
+            return json.loads(f.readline())
+
+    # ---------------- migration ----------------
+
+    def import_json(self, path="replies.json"):
+        """One-time import of the old replies.json array. Returns the number of entries imported."""
+        marker = os.path.join(self.directory, ".imported")
+        if os.path.exists(marker) or not os.path.exists(path):
+            return 0
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"Error importing {path}: {e}")
+            return 0
+        for entry in data:
+            if "ts" not in entry:
+                try:
+                    entry["ts"] = time.mktime(time.strptime(entry.get("timestamp", ""), "%Y-%m-%d %H:%M:%S"))
+                except ValueError:
+                    entry["ts"] = 0
+            self.append(entry)
+        self.flush()
+        with open(marker, "w", encoding="utf-8") as f:
+            f.write(path)
+        return len(data)
@@ -0,0 +1,105 @@
+import re
+import base64
+import quopri
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+# Where quoted history starts: "On <date>, <name> wrote:" (possibly wrapped onto
+# two lines, and its usual translations), Outlook separators and header blocks,
+# and "> " quoted lines
+_QUOTE_RE = re.compile(
+    r"^(?:"
+    r"(?:On|Am|Le|El|Il|Op)\b[^\n]{0,200}(?:\n[^\n]{0,200})?"
+    r"(?:wrote|schrieb|a écrit|escribió|ha scritto|schreef)\s*:\s*$"
+    r"|-{2,}\s*(?:Original Message|Forwarded message|Ursprüngliche Nachricht)\s*-{2,}"
+    r"|_{10,}\s*$"
+    r"|From:\s[^\n]+\n(?:Sent|Date):\s"
+    r"|>"
+    r")",
+    re.M | re.I,
+)
+# Where the signature starts: the "-- " delimiter and common mobile footers
+_SIGNATURE_RE = re.compile(
+    r"^(?:--\s*$|Sent from my \w+|Sent from (?:Mail|Outlook) for|Get Outlook for)", re.M | re.I)
+
+
+def decode_part(payload, charset, encoding):
+    """Decode a MIME part body; tolerates a part cut short by a partial fetch."""
+    if encoding == "base64":
+        payload = b"".join(payload.split())
+        payload = base64.b64decode(payload[:len(payload) // 4 * 4])
+    elif encoding == "quoted-printable":
+        payload = quopri.decodestring(payload)
+    try:
+        return payload.decode(charset, errors="ignore")
+    except LookupError:
+        return payload.decode("utf-8", errors="ignore")
+
+
+def strip_reply(text):
+    """Keep only the newly written part of a reply: no quoted history, no signature."""
+    text = text.replace("\r\n", "\n")
+    m = _QUOTE_RE.search(text)
+    new = text[:m.start()] if m else text
+    m = _SIGNATURE_RE.search(new)
+    if m:
+        new = new[:m.start()]
+    new = new.strip()
+    if not new:
+        # Inline answers between quoted lines: keep the unquoted lines
+        new = "\n".join(line for line in text.split("\n") if not line.startswith(">")).strip()
+    return new
+
+
+def parse_reply(job):
+    """(payload, charset, encoding, max_chars) -> cleaned reply text, at most ``max_chars`` long."""
+    payload, charset, encoding, max_chars = job
+    text = strip_reply(decode_part(payload, charset, encoding))
+    if max_chars and len(text) > max_chars:
+        text = text[:max_chars].rstrip() + "\n[…]"
+    return text
+
+
+class ReplyParser:
+    """Decodes and cleans reply bodies, in a process pool when there is enough work.
+
+    Batches smaller than ``min_batch`` are parsed inline (cheaper than the
+    round-trip to a worker process); ``workers=0`` disables the pool. The
+    pool is started on first use and falls back to inline parsing if it breaks.
+    """
+
+    def __init__(self, workers=None, max_chars=4000, min_batch=8):
+        self.workers = workers
+        self.max_chars = max_chars
+        self.min_batch = min_batch
+        self._pool = None
+        self._lock = threading.Lock()  # every mailbox's reply loop may parse at once
+
+    def parse_many(self, parts):
+        """[(payload, charset, encoding)] -> [text], in the same order."""
+        jobs = [(payload, charset, encoding, self.max_chars) for payload, charset, encoding in parts]
+        if self.workers == 0 or len(jobs) < self.min_batch:
+            return [parse_reply(job) for job in jobs]
+        try:
+            with self._lock:
+                if self._pool is None:
+                    # Never fork: by now the process has threads, SQLite and open SMTP/IMAP sockets
+                    self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=self._context())
+            chunksize = max(1, len(jobs) // ((self.workers or 4) * 4))
+            return list(self._pool.map(parse_reply, jobs, chunksize=chunksize))
+        except Exception as e:
+            print(f"Reply parser pool failed, parsing inline: {e}")
+            self.close()
+            self.workers = 0
+            return [parse_reply(job) for job in jobs]
+
+    @staticmethod
+    def _context():
+        methods = multiprocessing.get_all_start_methods()
+        return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
@@ -0,0 +1,135 @@
+import heapq
+import random
+import smtplib
+import threading
+from clock import SYSTEM_CLOCK
+
+# Outcome of a send attempt
+SENT = "sent"
+TRANSIENT = "transient"        # try again later (network errors, 4xx, message-level 5xx)
+RATE_LIMITED = "rate_limited"  # Gmail is throttling this account: back off and slow down
+SENDER_REJECTED = "sender_rejected"  # the account was refused (sender/policy 5xx): bench it, fail over
+PERMANENT = "permanent"        # the address will never accept mail: suppress it
+SUPPRESSED = "suppressed"      # on the suppression list, not attempted
+UNAVAILABLE = "unavailable"    # no account could send (all locked, or stopping): not attempted
+
+# Gmail throttling signals: 421 4.7.0 "Try again later", 454 4.7.0 "Too many
+# login attempts", 451 4.7.x, 550 5.4.5 "Daily user sending quota exceeded"
+_RATE_LIMIT_CODES = {421, 454}
+_RATE_LIMIT_ENHANCED = ("4.7.", "5.4.5")
+# Recipient-stage codes that condemn the address itself: 5.1.x bad mailbox or
+# domain, 5.2.1 mailbox disabled. Anything else (5.7.x policy and reputation
+# blocks, 5.3.4 message too big, ...) is about our account or message.
+_BAD_ADDRESS_ENHANCED = ("5.1.", "5.2.1")
+
+
+def _classify_response(code, message, recipient=False):
+    text = message.decode(errors="ignore") if isinstance(message, bytes) else str(message or "")
+    text = text.lstrip()
+    if code in _RATE_LIMIT_CODES or any(text.startswith(p) for p in _RATE_LIMIT_ENHANCED):
+        return RATE_LIMITED
+    if 500 <= code < 600:
+        if text.startswith("5.7."):
+            return SENDER_REJECTED
+        if recipient and any(text.startswith(p) for p in _BAD_ADDRESS_ENHANCED):
+            return PERMANENT
+    return TRANSIENT
+
+
+def classify_error(exc):
+    """Map an exception from an SMTP send to TRANSIENT, RATE_LIMITED, SENDER_REJECTED or PERMANENT.
+
+    Only a recipient refused with 5.1.x / 5.2.1 is PERMANENT for the lead.
+    """
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        kinds = {_classify_response(code, msg, recipient=True) for code, msg in exc.recipients.values()}
+        for kind in (RATE_LIMITED, SENDER_REJECTED, TRANSIENT, PERMANENT):
+            if kind in kinds:
+                return kind
+        return TRANSIENT
+    if isinstance(exc, smtplib.SMTPAuthenticationError):
+        # 454 4.7.0 "Too many login attempts" is throttling; anything else means the
+        # account is at fault, not the lead, and another account may send it
+        return RATE_LIMITED if _classify_response(exc.smtp_code, exc.smtp_error) == RATE_LIMITED else TRANSIENT
+    if isinstance(exc, smtplib.SMTPSenderRefused):
+        outcome = _classify_response(exc.smtp_code, exc.smtp_error)
+        return SENDER_REJECTED if exc.smtp_code >= 500 and outcome != RATE_LIMITED else outcome
+    if isinstance(exc, smtplib.SMTPResponseException):
+        return _classify_response(exc.smtp_code, exc.smtp_error)
+    return TRANSIENT
+
+
+def backoff_delay(attempt, base=30, cap=6 * 3600):
+    """Exponential backoff with full jitter for the given 1-based attempt."""
+    return random.uniform(base / 2, min(cap, base * 2 ** (attempt - 1)))
+
+
+class RetryQueue:
+    """Failed sends waiting for their backoff to expire, earliest first."""
+
+    def __init__(self, max_attempts=6, base=30, cap=6 * 3600, clock=None):
+        self.max_attempts = max_attempts
+        self.clock = clock or SYSTEM_CLOCK
+        self.base = base
+        self.cap = cap
+        self._heap = []
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def push(self, job, attempt, now=None):
+        """Queue ``job`` for retry; returns False once it has used up its attempts."""
+        if attempt > self.max_attempts:
+            return False
+        due = (now or self.clock.time()) + backoff_delay(attempt, self.base, self.cap)
+        with self._lock:
+            self._seq += 1
+            heapq.heappush(self._heap, (due, self._seq, attempt, job))
+        return True
+
+    def pop_due(self, now):
+        """[(job, attempt)] for every retry due at or before ``now``."""
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                _, _, attempt, job = heapq.heappop(self._heap)
+                due.append((job, attempt))
+        return due
+
+    def next_due(self):
+        with self._lock:
+            return self._heap[0][0] if self._heap else None
+
+    def __len__(self):
+        return len(self._heap)
+
+
+class SendGovernor:
+    """Global AIMD throttle shared by every account's rate limiter.
+
+    A throttling response halves ``factor`` (down to ``min_factor``); once no
+    throttling has been seen for ``cooldown`` seconds, every successful send
+    adds ``recover_step`` back until full speed is reached.
+    """
+
+    def __init__(self, min_factor=0.1, recover_step=0.05, cooldown=60, clock=None):
+        self.min_factor = min_factor
+        self.clock = clock or SYSTEM_CLOCK
+        self.recover_step = recover_step
+        self.cooldown = cooldown
+        self.factor = 1.0
+        self.throttle_events = 0
+        self._last_throttle = 0.0
+        self._lock = threading.Lock()
+
+    def on_throttle(self):
+        with self._lock:
+            self.factor = max(self.min_factor, self.factor / 2)
+            self.throttle_events += 1
+            self._last_throttle = self.clock.monotonic()
+
+    def on_success(self):
+        if self.factor >= 1.0:
+            return
+        with self._lock:
+            if self.clock.monotonic() - self._last_throttle >= self.cooldown:
+                self.factor = min(1.0, self.factor + self.recover_step)
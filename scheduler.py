@@ -0,0 +1,65 @@
+import heapq
+import threading
+
+
+class FollowUpScheduler:
+    """Priority queue of follow-up due times, one pending entry per lead.
+
+    Rescheduling a lead replaces its previous entry (stale heap items are
+    skipped lazily). ``on_wake`` is called whenever a new entry becomes the
+    earliest one, so the automation loop can cut its current wait short.
+    """
+
+    def __init__(self, on_wake=None):
+        self.on_wake = on_wake
+        self._heap = []
+        self._pending = {}   # email -> (due, step)
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def schedule(self, email, due, step):
+        with self._lock:
+            self._pending[email] = (due, step)
+            self._seq += 1
+            heapq.heappush(self._heap, (due, self._seq, email, step))
+            earliest = self._heap[0][2] == email and self._heap[0][0] == due
+        if earliest and self.on_wake:
+            self.on_wake()
+
+    def cancel(self, email):
+        with self._lock:
+            self._pending.pop(email, None)
+
+    def _drop_stale(self):
+        while self._heap:
+            due, _, email, step = self._heap[0]
+            if self._pending.get(email) == (due, step):
+                return
+            heapq.heappop(self._heap)
+
+    def pop_due(self, now):
+        """Remove and return [(email, step)] for every entry due at or before ``now``."""
+        due_items = []
+        with self._lock:
+            while True:
+                self._drop_stale()
+                if not self._heap or self._heap[0][0] > now:
+                    break
+                _, _, email, step = heapq.heappop(self._heap)
+                del self._pending[email]
+                due_items.append((email, step))
+        return due_items
+
+    def next_due(self):
+        """Due time of the earliest entry, or None if nothing is scheduled."""
+        with self._lock:
+            self._drop_stale()
+            return self._heap[0][0] if self._heap else None
+
+    def due_for(self, email):
+        with self._lock:
+            entry = self._pending.get(email)
+            return entry[0] if entry else None
+
+    def __len__(self):
+        return len(self._pending)
@@ -0,0 +1,165 @@
+import queue
+import threading
+from collections import deque
+from clock import SYSTEM_CLOCK
+
+
+class RateLimiter:
+    """Token bucket for the per-minute rate plus a rolling 24h send quota.
+
+    ``acquire`` blocks until a send is allowed, and returns False if the
+    stop event fires first. An optional ``governor`` (see retry.SendGovernor)
+    scales the per-minute rate down while Gmail is throttling us.
+    """
+
+    def __init__(self, per_minute=20, per_day=500, burst=None, governor=None, clock=None):
+        self.per_minute = per_minute
+        self.governor = governor
+        self.clock = clock or SYSTEM_CLOCK
+        self.per_day = per_day
+        self.capacity = burst or max(1, per_minute // 4)
+        self._tokens = float(self.capacity)
+        self._last = self.clock.monotonic()
+        self._day = deque()  # monotonic timestamps of sends in the last 24h
+        self._lock = threading.Lock()
+
+    def _rate(self):
+        """Current sends per second after the governor's slow-down."""
+        factor = self.governor.factor if self.governor else 1.0
+        return self.per_minute * factor / 60.0
+
+    def _refill(self, now):
+        rate = self._rate()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * rate)
+        self._last = now
+
+    def _wait_time(self, now):
+        """Seconds until the next send is allowed (0 if allowed now)."""
+        while self._day and now - self._day[0] >= 86400:
+            self._day.popleft()
+        if self.per_day and len(self._day) >= self.per_day:
+            return 86400 - (now - self._day[0])
+        self._refill(now)
+        if self._tokens >= 1:
+            return 0
+        return (1 - self._tokens) / self._rate()
+
+    def try_acquire(self):
+        """Take a send slot if one is free; otherwise return the seconds until one is."""
+        with self._lock:
+            now = self.clock.monotonic()
+            wait = self._wait_time(now)
+            if wait <= 0:
+                self._tokens -= 1
+                self._day.append(now)
+                return 0
+            return wait
+
+    def acquire(self, stop_event=None):
+        while True:
+            wait = self.try_acquire()
+            if not wait:
+                return True
+            if self.clock.sleep(wait if stop_event is None else min(wait, 60), stop_event):
+                return False
+
+    def preload(self, sent_at):
+        """Count earlier sends (wall-clock times, e.g. from campaign.db) against the 24h quota."""
+        with self._lock:
+            offset = self.clock.monotonic() - self.clock.time()
+            self._day = deque(sorted([*self._day, *(t + offset for t in sent_at)]))
+
+    def usage(self):
+        with self._lock:
+            now = self.clock.monotonic()
+            while self._day and now - self._day[0] >= 86400:
+                self._day.popleft()
+            return {"sent_24h": len(self._day), "per_day": self.per_day,
+                    "per_minute": self.per_minute}
+
+
+class SendPipeline:
+    """Bounded worker pool that drains a queue of send jobs in the background.
+
+    ``send_func(job)`` does the actual send and returns True/False;
+    ``on_progress(done, total, sent, failed)`` is called after every job.
+    """
+
+    _DONE = object()
+
+    def __init__(self, send_func, workers=4, on_progress=None, queue_size=None):
+        self.send_func = send_func
+        self.workers = workers
+        self.on_progress = on_progress
+        self._queue = queue.Queue(maxsize=queue_size or workers * 8)
+        self._threads = []
+        self._lock = threading.Lock()
+        self._cancelled = threading.Event()
+        self.submitted = 0
+        self.done = 0
+        self.sent = 0
+        self.failed = 0
+
+    def start(self):
+        for i in range(self.workers):
+            t = threading.Thread(target=self._worker, name=f"send-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def submit(self, job):
+        """Queue a job; blocks while the queue is full. Returns False once cancelled."""
+        while not self._cancelled.is_set():
+            try:
+                self._queue.put(job, timeout=0.5)
+            except queue.Full:
+                continue
+            with self._lock:
+                self.submitted += 1
+            return True
+        return False
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def close(self):
+        """No more jobs: workers exit once the queue is drained."""
+        for _ in self._threads:
+            self._queue.put(self._DONE)
+
+    def cancel(self):
+        self._cancelled.set()
+        # Drop anything still queued so the workers see the sentinels quickly.
+        try:
+            while True:
+                self._queue.get_nowait()
+        except queue.Empty:
+            pass
+        self.close()
+
+    def join(self, timeout=None):
+        for t in self._threads:
+            t.join(timeout)
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            if job is self._DONE:
+                return
+            if self._cancelled.is_set():
+                continue
+            try:
+                ok = self.send_func(job)
+            except Exception as e:
+                print(f"Error in send worker: {e}")
+                ok = False
+            with self._lock:
+                self.done += 1
+                if ok:
+                    self.sent += 1
+                else:
+                    self.failed += 1
+                progress = (self.done, self.submitted, self.sent, self.failed)
+            if self.on_progress:
+                self.on_progress(*progress)
@@ -0,0 +1,263 @@
+import os
+import re
+import csv
+import sys
+import time
+import heapq
+import random
+import argparse
+import tempfile
+from email.utils import make_msgid
+from clock import VirtualClock
+import bounces
+
+# Replays a whole campaign on a virtual clock, in seconds instead of days:
+#
+#   python simulator.py --leads 100000 --accounts 4 --followup-intervals 86400 259200 604800
+#   python simulator.py --config campaign.json --leads 20000 --volume-csv hourly.csv --timelines 5
+#
+# The real engine (GmailAutomation: quotas, follow-up scheduler, retry queue,
+# reply handling) runs single-threaded; SMTP is replaced by a transport that
+# accepts everything and IMAP by a seeded model of how leads answer.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+_MESSAGE_ID_RE = re.compile(r"^Message-ID: (.+)$", re.M)
+
+
+class SimTransport:
+    """Stands in for SMTPPool: accepts every message and reports it to ``on_send``."""
+
+    def __init__(self, on_send):
+        self.on_send = on_send
+        self.sent = 0
+
+    def send(self, user, password, from_addr, to_addrs, raw):
+        self.sent += 1
+        found = _MESSAGE_ID_RE.search(raw)
+        for to_addr in to_addrs:
+            self.on_send(from_addr, to_addr, found.group(1).strip() if found else None)
+
+    def warm(self, user, password):
+        pass
+
+    def close_all(self):
+        pass
+
+
+class ReplyModel:
+    """Synthetic lead behaviour: who replies, bounces or is out of office, and when.
+
+    Each message to a lead is answered with probability ``reply_rate`` (our
+    auto-replies with ``continue_rate``) after an exponentially distributed
+    delay averaging ``reply_delay`` seconds. A ``bounce_rate`` share of leads
+    bounce the initial email and an ``ooo_rate`` share answer it with an
+    out-of-office note.
+    """
+
+    def __init__(self, reply_rate=0.05, continue_rate=0.3, reply_delay=6 * 3600,
+                 ooo_rate=0.02, bounce_rate=0.01, seed=1):
+        self.reply_rate = reply_rate
+        self.continue_rate = continue_rate
+        self.reply_delay = reply_delay
+        self.ooo_rate = ooo_rate
+        self.bounce_rate = bounce_rate
+        self._rng = random.Random(seed)
+
+    def respond(self, lead_email, kind, message_id, now):
+        """[(due, message dict)] for one message we sent (``kind`` as in the message index)."""
+        rng = self._rng
+        if kind == "initial":
+            roll = rng.random()
+            if roll < self.bounce_rate:
+                return [(now + rng.uniform(30, 600), {
+                    "kind": bounces.BOUNCE, "bounced": [(lead_email, "5.1.1")]})]
+            if roll < self.bounce_rate + self.ooo_rate:
+                return [(now + rng.uniform(5, 120), {
+                    "kind": bounces.AUTO_RESPONSE, "lead": lead_email, "sender": lead_email,
+                    "subject": "Out of office"})]
+        rate = self.continue_rate if kind == "auto_replies" else self.reply_rate
+        if rng.random() >= rate:
+            return []
+        domain = lead_email.rpartition("@")[2]
+        return [(now + rng.expovariate(1 / self.reply_delay), {
+            "kind": bounces.REPLY, "sender": lead_email, "subject": "Re: your email",
+            "message_id": make_msgid(domain=domain), "in_reply_to": message_id,
+            "references": [message_id] if message_id else [], "body": "Sounds interesting, tell me more."})]
+
+
+class CampaignSimulator:
+    """Drives a GmailAutomation on a VirtualClock through a synthetic campaign."""
+
+    def __init__(self, bot, model, log_callback=None):
+        self.bot = bot
+        self.model = model
+        self.clock = bot.clock
+        self.log_callback = log_callback
+        self.start = self.clock.time()
+        self._events = []   # (due, seq, mailbox, message dict)
+        self._seq = 0
+        self._sent = []     # sends not yet shown to the reply model
+        bot.smtp_pool = SimTransport(self._on_send)
+
+    def _on_send(self, from_addr, to_addr, message_id):
+        self._sent.append((self.clock.time(), from_addr, to_addr, message_id))
+
+    def _respond(self):
+        # The message index only knows a send once it returned, so the model runs afterwards
+        for sent_at, from_addr, to_addr, message_id in self._sent:
+            found = self.bot.message_index.resolve([message_id])
+            kind = found[1] if found else "initial"
+            for due, message in self.model.respond(to_addr, kind, message_id, sent_at):
+                self._seq += 1
+                heapq.heappush(self._events, (due, self._seq, from_addr, message))
+        self._sent.clear()
+
+    def _deliver_due(self):
+        """Hand the engine every message that has arrived by now and run one loop pass."""
+        now = self.clock.time()
+        while self._events and self._events[0][0] <= now:
+            _, _, user, message = heapq.heappop(self._events)
+            if message["kind"] != bounces.BOUNCE and "lead" not in message:
+                message["lead"] = self.bot.match_reply(message["sender"], message["in_reply_to"],
+                                                       message["references"])
+            self.bot.deliver(user, self.bot.incoming([message]))
+        next_due = self.bot.process_due(self._log)
+        self._respond()
+        return next_due
+
+    def _log(self, text):
+        if self.log_callback:
+            self.log_callback(f"[{_offset(self.clock.time() - self.start)}] {text}")
+
+    def run(self, until):
+        """Send every initial email, then replay replies and follow-ups up to ``until`` (epoch seconds)."""
+        bot = self.bot
+        next_due = None
+        for lead in bot.registry.since(0):
+            now = self.clock.time()
+            if (next_due is not None and next_due <= now) or (self._events and self._events[0][0] <= now):
+                next_due = self._deliver_due()
+            bot.send_initial(lead, self._log)
+            self._respond()
+            next_due = min(filter(None, (next_due, bot.scheduler.next_due(), bot.retry_queue.next_due())),
+                           default=None)
+        while True:
+            next_due = self._deliver_due()
+            pending = [t for t in (next_due, self._events[0][0] if self._events else None) if t is not None]
+            if not pending or min(pending) > until:
+                break
+            self.clock.advance_to(min(pending))
+        bot.store.flush()
+
+
+def _offset(seconds):
+    """``+2d03h15m`` style offset from the campaign start."""
+    minutes = int(seconds // 60)
+    days, minutes = divmod(minutes, 24 * 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"+{days}d{hours:02d}h{minutes:02d}m"
+
+
+def _stamp(ts):
+    return time.strftime("%Y-%m-%d %H:%M", time.localtime(ts))
+
+
+def report(sim, wall_seconds, timelines=0, volume_csv=None, schedule_csv=None):
+    store = sim.bot.store
+    start = sim.start
+    sent = store.volume(3600)
+    print(f"Simulated {(sim.clock.time() - start) / 86400:.1f} days in {wall_seconds:.1f}s wall time")
+    for kind, count in sorted(store.counts().items()):
+        print(f"  {kind:<14} {count}")
+
+    if sent:
+        busiest = max(sent, key=lambda row: row[1])
+        daily = {}
+        for hour, count in sent:
+            day = int((hour - start) // 86400)
+            daily[day] = daily.get(day, 0) + count
+        print(f"Emails sent per hour: peak {busiest[1]} at {_stamp(busiest[0])}, "
+              f"average {sum(c for _, c in sent) / len(sent):.0f} over {len(sent)} active hours")
+        print("Emails sent per day:")
+        for day, count in sorted(daily.items()):
+            print(f"  day {day + 1:<4} {count}")
+
+    if volume_csv:
+        with open(volume_csv, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["hour", "offset", "sent"])
+            for hour, count in sent:
+                writer.writerow([_stamp(hour), _offset(hour - start), count])
+        print(f"Hourly volume written to {volume_csv}")
+    if schedule_csv:
+        with open(schedule_csv, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["time", "offset", "email", "kind", "step"])
+            for ts, email_addr, kind, step in store.events():
+                writer.writerow([_stamp(ts), _offset(ts - start), email_addr, kind, step])
+        print(f"Message schedule written to {schedule_csv}")
+
+    for lead in sim.bot.registry.since(0)[:timelines]:
+        print(f"Timeline for {lead.email}:")
+        for kind, step, ts in store.history(lead.email):
+            number = "" if step is None or kind not in ("followup", "auto_reply") else f" #{step + 1}"
+            print(f"  {_offset(ts - start)}  {kind}{number}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a campaign on a virtual clock.")
+    parser.add_argument("--config", help="campaign JSON as used by main_cli.py (settings and account count)")
+    parser.add_argument("--messages", help="templates file (default: the bundled messages.json)")
+    parser.add_argument("--leads", type=int, default=1000, help="number of synthetic leads")
+    parser.add_argument("--accounts", type=int, help="sender mailboxes (default: the config's, else 1)")
+    parser.add_argument("--per-minute", type=int, help="per-account send quota per minute")
+    parser.add_argument("--per-day", type=int, help="per-account send quota per day")
+    parser.add_argument("--followup-intervals", type=float, nargs="+", help="seconds before each follow-up")
+    parser.add_argument("--followup-limit", type=int)
+    parser.add_argument("--auto-reply-limit", type=int)
+    parser.add_argument("--reply-rate", type=float, default=0.05, help="chance a lead answers an email")
+    parser.add_argument("--continue-rate", type=float, default=0.3, help="chance a lead answers an auto-reply")
+    parser.add_argument("--reply-delay", type=float, default=6 * 3600, help="mean seconds before a reply")
+    parser.add_argument("--ooo-rate", type=float, default=0.02, help="share of leads out of office")
+    parser.add_argument("--bounce-rate", type=float, default=0.01, help="share of leads that bounce")
+    parser.add_argument("--days", type=float, default=60, help="stop the replay after this many days")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--volume-csv", help="write emails sent per hour to this CSV")
+    parser.add_argument("--schedule-csv", help="write every event (sends, replies, bounces) to this CSV")
+    parser.add_argument("--timelines", type=int, default=3, help="print the timeline of the first N leads")
+    parser.add_argument("--verbose", action="store_true", help="print the engine log with simulated times")
+    args = parser.parse_args(argv)
+
+    from automation import GmailAutomation
+    from main_cli import load_config, SETTINGS
+
+    config = load_config(args.config)
+    messages = args.messages or config.get("messages") or os.path.join(HERE, "messages.json")
+    clock = VirtualClock(start=time.time() // 3600 * 3600)
+    bot = GmailAutomation(messages, tempfile.mkdtemp(prefix="sim-"), clock=clock)
+    if bot.templates.error:
+        print(f"❌ {bot.templates.error}")
+        return 2
+    for key in SETTINGS:
+        if key in config:
+            setattr(bot, key, config[key])
+    for key in ("followup_intervals", "followup_limit", "auto_reply_limit"):
+        if getattr(args, key) is not None:
+            setattr(bot, key, getattr(args, key))
+    accounts = args.accounts or len(config.get("accounts", [])) or 1
+    for i in range(accounts):
+        bot.add_account(f"sender{i}@sim.test", "", args.per_minute, args.per_day)
+    bot.add_leads((f"Lead {i}", f"lead{i}@leads.test") for i in range(args.leads))
+
+    model = ReplyModel(args.reply_rate, args.continue_rate, args.reply_delay, args.ooo_rate,
+                       args.bounce_rate, args.seed)
+    sim = CampaignSimulator(bot, model, print if args.verbose else None)
+    started = time.perf_counter()
+    sim.run(until=sim.start + args.days * 86400)
+    report(sim, time.perf_counter() - started, args.timelines, args.volume_csv, args.schedule_csv)
+    bot.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,196 @@
+import time
+import smtplib
+import threading
+from collections import deque
+
+# Keys of SMTPPool.stats() that are current session counts; the rest are running totals
+SESSION_STATES = ("open", "idle", "in_use")
+
+
+class _PooledSession:
+    __slots__ = ("server", "created", "last_used", "sent")
+
+    def __init__(self, server):
+        self.server = server
+        self.created = time.monotonic()
+        self.last_used = self.created
+        self.sent = 0
+
+
+class SMTPPool:
+    """Keeps authenticated SMTP sessions open and hands them out for reuse.
+
+    Sessions are keyed by (user, password). An idle session is checked with
+    NOOP before reuse, dropped once it has been idle longer than
+    ``idle_timeout`` and retired after ``max_messages`` sends. ``use_ssl=False``
+    speaks plain SMTP (local test servers).
+    """
+
+    def __init__(self, host="smtp.gmail.com", port=465, max_size=4,
+                 idle_timeout=240, noop_after=30, max_messages=90, timeout=30, use_ssl=True):
+        self.host = host
+        self.port = port
+        self.use_ssl = use_ssl
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.noop_after = noop_after
+        self.max_messages = max_messages
+        self.timeout = timeout
+
+        self._cond = threading.Condition()
+        self._idle = {}      # key -> deque of _PooledSession
+        self._open = {}      # key -> number of sessions open (idle + in use)
+        self._stats = {
+            "connects": 0,
+            "reuses": 0,
+            "noop_checks": 0,
+            "reconnects": 0,
+            "retired": 0,
+            "messages": 0,
+            "errors": 0,
+        }
+
+    # ---------------- session lifecycle ----------------
+
+    def _connect(self, user, password):
+        smtp_class = smtplib.SMTP_SSL if self.use_ssl else smtplib.SMTP
+        server = smtp_class(self.host, self.port, timeout=self.timeout)
+        try:
+            server.login(user, password)
+        except Exception:
+            self._quit(server)
+            raise
+        with self._cond:
+            self._stats["connects"] += 1
+        return _PooledSession(server)
+
+    @staticmethod
+    def _quit(server):
+        try:
+            server.quit()
+        except Exception:
+            try:
+                server.close()
+            except Exception:
+                pass
+
+    def _is_alive(self, session):
+        """Return True if the session can be reused as-is."""
+        idle = time.monotonic() - session.last_used
+        if idle > self.idle_timeout:
+            return False
+        if idle < self.noop_after:
+            return True
+        with self._cond:
+            self._stats["noop_checks"] += 1
+        try:
+            code, _ = session.server.noop()
+            return code == 250
+        except Exception:
+            return False
+
+    def _discard(self, key, session):
+        self._quit(session.server)
+        with self._cond:
+            self._open[key] -= 1
+            self._cond.notify()
+
+    def acquire(self, user, password):
+        """Check out a live, logged-in session for (user, password)."""
+        key = (user, password)
+        while True:
+            with self._cond:
+                idle = self._idle.setdefault(key, deque())
+                while not idle and self._open.get(key, 0) >= self.max_size:
+                    self._cond.wait()
+                session = idle.pop() if idle else None
+                if session is None:
+                    self._open[key] = self._open.get(key, 0) + 1
+            if session is None:
+                try:
+                    return self._connect(user, password)
+                except Exception:
+                    with self._cond:
+                        self._open[key] -= 1
+                        self._stats["errors"] += 1
+                        self._cond.notify()
+                    raise
+            if self._is_alive(session):
+                with self._cond:
+                    self._stats["reuses"] += 1
+                return session
+            with self._cond:
+                self._stats["reconnects"] += 1
+            self._discard(key, session)
+
+    def release(self, user, password, session, broken=False):
+        """Return a session to the pool, or close it if it is spent or broken."""
+        key = (user, password)
+        if broken or session.sent >= self.max_messages:
+            if not broken:
+                with self._cond:
+                    self._stats["retired"] += 1
+            self._discard(key, session)
+            return
+        session.last_used = time.monotonic()
+        with self._cond:
+            self._idle.setdefault(key, deque()).append(session)
+            self._cond.notify()
+
+    # ---------------- public API ----------------
+
+    def send(self, user, password, from_addr, to_addrs, msg):
+        """Send one message over a pooled session, retrying once on a dropped link."""
+        for attempt in range(2):
+            session = self.acquire(user, password)
+            try:
+                session.server.sendmail(from_addr, to_addrs, msg)
+            except (smtplib.SMTPServerDisconnected, ConnectionError):
+                # The server dropped us between the liveness check and the send.
+                self.release(user, password, session, broken=True)
+                with self._cond:
+                    self._stats["errors"] += 1
+                if attempt:
+                    raise
+                with self._cond:
+                    self._stats["reconnects"] += 1
+                continue
+            except smtplib.SMTPException:
+                # Refused by the server; smtplib has already RSET the session, or
+                # closed it outright on a 421, which must not go back to the idle set.
+                self.release(user, password, session, broken=session.server.sock is None)
+                with self._cond:
+                    self._stats["errors"] += 1
+                raise
+            except Exception:
+                self.release(user, password, session, broken=True)
+                with self._cond:
+                    self._stats["errors"] += 1
+                raise
+            session.sent += 1
+            with self._cond:
+                self._stats["messages"] += 1
+            self.release(user, password, session)
+            return
+
+    def warm(self, user, password):
+        """Open (or reuse) one session so the first send skips the handshake."""
+        session = self.acquire(user, password)
+        self.release(user, password, session)
+
+    def close_all(self):
+        """Close every idle session. Sessions in use are closed on release."""
+        with self._cond:
+            sessions = [(key, s) for key, idle in self._idle.items() for s in idle]
+            for idle in self._idle.values():
+                idle.clear()
+        for key, session in sessions:
+            self._discard(key, session)
+
+    def stats(self):
+        with self._cond:
+            data = dict(self._stats)
+            data["open"] = sum(self._open.values())
+            data["idle"] = sum(len(idle) for idle in self._idle.values())
+        data["in_use"] = data["open"] - data["idle"]
+        return data
@@ -0,0 +1,228 @@
+import time
+import sqlite3
+import threading
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS leads (
+    email          TEXT PRIMARY KEY,
+    name           TEXT,
+    sent_at        REAL,
+    last_sent      REAL,
+    reply_count    INTEGER NOT NULL DEFAULT 0,
+    followup_count INTEGER NOT NULL DEFAULT 0,
+    replied_at     REAL,
+    next_due       REAL,
+    account        TEXT,
+    suppressed     INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS leads_next_due ON leads(next_due) WHERE next_due IS NOT NULL;
+CREATE TABLE IF NOT EXISTS events (
+    id    INTEGER PRIMARY KEY,
+    email TEXT NOT NULL,
+    kind  TEXT NOT NULL,      -- initial | followup | auto_reply | reply | auto_response | failed | bounce | suppressed
+    step  INTEGER,
+    ts    REAL NOT NULL,
+    account TEXT              -- the lead's mailbox: for sends, the account that sent it
+);
+CREATE INDEX IF NOT EXISTS events_email ON events(email, ts);
+CREATE TABLE IF NOT EXISTS messages (
+    message_id TEXT PRIMARY KEY,  -- Message-ID header of a message we sent
+    email      TEXT NOT NULL,
+    kind       TEXT NOT NULL,     -- initial | follow_ups | auto_replies
+    step       INTEGER,
+    ts         REAL NOT NULL
+);
+"""
+
+# Event kinds that are emails we sent (and count against an account's quota)
+SENT_KINDS = ("initial", "followup", "auto_reply")
+
+
+class CampaignStore:
+    """Durable per-lead campaign state in SQLite (WAL mode, batched commits).
+
+    Every send, reply and follow-up step is written through here so that a
+    restarted campaign knows which leads already got which message. Writes
+    are committed every ``commit_every`` changes or ``commit_interval``
+    seconds, whichever comes first, and on ``flush()``. A background
+    thread commits stragglers, so a write followed by a quiet spell (say,
+    the last sends before the daily quota runs out) is not left pending.
+    """
+
+    def __init__(self, path="campaign.db", commit_every=100, commit_interval=1.0):
+        self.path = path
+        self.commit_every = commit_every
+        self.commit_interval = commit_interval
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(leads)")}
+        if "account" not in columns:  # databases created before multi-account support
+            self._db.execute("ALTER TABLE leads ADD COLUMN account TEXT")
+        if "suppressed" not in columns:
+            self._db.execute("ALTER TABLE leads ADD COLUMN suppressed INTEGER NOT NULL DEFAULT 0")
+        if "account" not in {row[1] for row in self._db.execute("PRAGMA table_info(events)")}:
+            self._db.execute("ALTER TABLE events ADD COLUMN account TEXT")
+        self._db.execute("CREATE INDEX IF NOT EXISTS events_account ON events(account, ts)")
+        self._db.commit()
+        self._pending = 0
+        self._last_commit = time.monotonic()
+        self._closed = threading.Event()
+        threading.Thread(target=self._flush_loop, name="store-flush", daemon=True).start()
+
+    def _flush_loop(self):
+        while not self._closed.wait(self.commit_interval):
+            self.flush()
+
+    def _changed(self):
+        self._pending += 1
+        if (self._pending >= self.commit_every
+                or time.monotonic() - self._last_commit >= self.commit_interval):
+            self._commit()
+
+    def _commit(self):
+        self._db.commit()
+        self._pending = 0
+        self._last_commit = time.monotonic()
+
+    def flush(self):
+        with self._lock:
+            if self._pending:
+                self._commit()
+
+    def close(self):
+        self._closed.set()
+        with self._lock:
+            self._commit()  # leaves nothing pending, so a late flush() is a no-op
+            self._db.close()
+
+    # ---------------- writes ----------------
+
+    def _save_lead(self, lead):
+        self._db.execute(
+            "INSERT INTO leads (email, name, sent_at, last_sent, reply_count, followup_count,"
+            " replied_at, account, suppressed) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT(email) DO UPDATE SET name=excluded.name, sent_at=excluded.sent_at,"
+            " last_sent=excluded.last_sent, reply_count=excluded.reply_count,"
+            " followup_count=excluded.followup_count, replied_at=excluded.replied_at,"
+            " account=excluded.account, suppressed=excluded.suppressed",
+            (lead.email, lead.name, lead.sent_at, lead.last_sent, lead.reply_count,
+             lead.followup_count, lead.replied_at, lead.account, int(lead.suppressed)),
+        )
+
+    def record(self, lead, kind, step=None, ts=None):
+        """Persist the lead's counters and log one event (a send or a received reply)."""
+        with self._lock:
+            self._save_lead(lead)
+            self._db.execute("INSERT INTO events (email, kind, step, ts, account) VALUES (?, ?, ?, ?, ?)",
+                             (lead.email, kind, step, ts or time.time(), lead.account))
+            self._changed()
+
+    def record_message(self, message_id, email, kind, step=None, ts=None):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO messages (message_id, email, kind, step, ts) VALUES (?, ?, ?, ?, ?)",
+                (message_id, email, kind, step, ts or time.time()))
+            self._changed()
+
+    def set_next_due(self, email, due):
+        with self._lock:
+            self._db.execute("UPDATE leads SET next_due = ? WHERE email = ?", (due, email))
+            self._changed()
+
+    # ---------------- reads ----------------
+
+    def restore(self, leads):
+        """Copy saved counters onto Lead objects; returns {email: next_due} for pending follow-ups."""
+        by_email = {lead.email: lead for lead in leads}
+        emails = list(by_email)
+        due = {}
+        with self._lock:
+            for i in range(0, len(emails), 500):
+                chunk = emails[i:i + 500]
+                rows = self._db.execute(
+                    "SELECT email, sent_at, last_sent, reply_count, followup_count, replied_at,"
+                    f" next_due, account, suppressed FROM leads WHERE email IN ({','.join('?' * len(chunk))})",
+                    chunk,
+                )
+                for (email, sent_at, last_sent, reply_count, followup_count, replied_at,
+                     next_due, account, suppressed) in rows:
+                    lead = by_email[email]
+                    lead.sent_at = sent_at
+                    lead.last_sent = last_sent
+                    lead.reply_count = reply_count
+                    lead.followup_count = followup_count
+                    lead.replied_at = replied_at
+                    lead.account = account
+                    lead.suppressed = bool(suppressed)
+                    if next_due is not None and not suppressed:
+                        due[email] = next_due
+        return due
+
+    def unanswered(self, emails):
+        """Those of ``emails`` whose last "reply" event has no "auto_reply" after it."""
+        emails = list(emails)
+        found = []
+        with self._lock:
+            for i in range(0, len(emails), 500):
+                chunk = emails[i:i + 500]
+                found += [email for email, in self._db.execute(
+                    "SELECT email FROM events WHERE kind IN ('reply', 'auto_reply')"
+                    f" AND email IN ({','.join('?' * len(chunk))}) GROUP BY email"
+                    " HAVING MAX(CASE WHEN kind = 'reply' THEN ts END)"
+                    " > COALESCE(MAX(CASE WHEN kind = 'auto_reply' THEN ts END), 0)", chunk)]
+        return found
+
+    def due_before(self, t, limit=1000):
+        """[(email, next_due)] of follow-ups due before ``t``, earliest first (uses the next_due index)."""
+        with self._lock:
+            return self._db.execute(
+                "SELECT email, next_due FROM leads WHERE next_due IS NOT NULL AND next_due < ?"
+                " ORDER BY next_due LIMIT ?", (t, limit)).fetchall()
+
+    def find_message(self, message_ids):
+        """(message_id, (email, kind, step)) for the first of ``message_ids`` we sent, else None."""
+        with self._lock:
+            for message_id in message_ids:
+                row = self._db.execute("SELECT email, kind, step FROM messages WHERE message_id = ?",
+                                       (message_id,)).fetchone()
+                if row:
+                    return message_id, tuple(row)
+        return None
+
+    def history(self, email):
+        with self._lock:
+            return self._db.execute(
+                "SELECT kind, step, ts FROM events WHERE email = ? ORDER BY ts", (email,)).fetchall()
+
+    def events(self, kinds=None):
+        """[(ts, email, kind, step)] of every logged event (only ``kinds`` if given), oldest first."""
+        query, args = "SELECT ts, email, kind, step FROM events", ()
+        if kinds:
+            query += f" WHERE kind IN ({','.join('?' * len(kinds))})"
+            args = tuple(kinds)
+        with self._lock:
+            return self._db.execute(query + " ORDER BY ts", args).fetchall()
+
+    def sent_since(self, account, since):
+        """Timestamps of the emails ``account`` sent at or after ``since``, oldest first."""
+        with self._lock:
+            return [ts for ts, in self._db.execute(
+                f"SELECT ts FROM events WHERE account = ? AND ts >= ?"
+                f" AND kind IN ({','.join('?' * len(SENT_KINDS))}) ORDER BY ts",
+                (account, since, *SENT_KINDS))]
+
+    def volume(self, bucket=3600, kinds=SENT_KINDS):
+        """[(bucket_start, count)] of events per ``bucket`` seconds; by default, emails sent."""
+        with self._lock:
+            return self._db.execute(
+                f"SELECT CAST(ts / ? AS INTEGER) * ?, COUNT(*) FROM events"
+                f" WHERE kind IN ({','.join('?' * len(kinds))}) GROUP BY 1 ORDER BY 1",
+                (bucket, bucket, *kinds)).fetchall()
+
+    def counts(self):
+        """Totals per event kind, e.g. {"initial": 120, "followup": 40, ...}."""
+        with self._lock:
+            return dict(self._db.execute("SELECT kind, COUNT(*) FROM events GROUP BY kind"))
@@ -0,0 +1,54 @@
+import os
+import hashlib
+import threading
+from array import array
+from lead_registry import normalize_email
+
+
+def _key(email_addr):
+    digest = hashlib.blake2b(normalize_email(email_addr).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+class SuppressionIndex:
+    """Addresses that must never be mailed again (hard bounces, permanent rejections).
+
+    Stored as 64-bit blake2b hashes of the normalized address: an in-memory
+    set for O(1) membership tests and an append-only file of 8-byte records,
+    so it survives restarts and carries over between campaigns. At 64 bits a
+    false match is practically impossible even for millions of addresses,
+    unlike a Bloom filter, which would silently skip some live leads.
+    """
+
+    def __init__(self, path="suppressed.bin"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._keys = set()
+        if os.path.exists(path):
+            records = array("Q")
+            with open(path, "rb") as f:
+                data = f.read()
+            records.frombytes(data[:len(data) - len(data) % 8])  # drop a torn last write
+            self._keys.update(records)
+        self._file = open(path, "ab")
+
+    def __contains__(self, email_addr):
+        return _key(email_addr) in self._keys
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, email_addr):
+        """Suppress an address; returns False if it was already suppressed."""
+        key = _key(email_addr)
+        with self._lock:
+            if key in self._keys:
+                return False
+            self._keys.add(key)
+            self._file.write(array("Q", [key]).tobytes())
+            self._file.flush()
+        return True
+
+    def close(self):
+        with self._lock:
+            self._file.close()
@@ -0,0 +1,225 @@
+import os
+import json
+import base64
+import string
+import threading
+from email.header import Header
+
+FIELDS = ("name", "email", "number")  # placeholders a template may use
+
+DEFAULT_MESSAGES = {
+    "initial": {"subject": "Hello", "body": "Hi {name},"},
+    "auto_replies": ["Thanks {name}, reply #{number}"],
+    "follow_ups": ["Just checking in {name}"],
+}
+
+# Used when a list is shorter than auto_reply_limit / followup_limit
+FALLBACKS = {
+    "auto_replies": "Thank you {name}, this is auto reply #{number}",
+    "follow_ups": "Hi {name}, just checking in (follow-up #{number})",
+}
+
+SUBJECT_PREFIX = {"initial": "", "auto_replies": "Re: ", "follow_ups": "Follow-up: "}
+
+
+class TemplateError(ValueError):
+    pass
+
+
+class CompiledTemplate:
+    """A template split once into literal text and placeholder names."""
+
+    __slots__ = ("source", "parts", "fields")
+
+    def __init__(self, source, where):
+        if not isinstance(source, str):
+            raise TemplateError(f"{where}: expected a string")
+        parts = []
+        try:
+            for literal, field, spec, conversion in string.Formatter().parse(source):
+                if literal:
+                    parts.append((True, literal))
+                if field is None:
+                    continue
+                if field not in FIELDS:
+                    raise TemplateError(f"{where}: unknown placeholder {{{field}}} "
+                                        f"(allowed: {', '.join('{%s}' % f for f in FIELDS)})")
+                if spec or conversion:
+                    raise TemplateError(f"{where}: format specs are not supported in {{{field}}}")
+                parts.append((False, field))
+        except ValueError as e:
+            if isinstance(e, TemplateError):
+                raise
+            raise TemplateError(f"{where}: {e}")
+        self.source = source
+        self.parts = tuple(parts)
+        self.fields = frozenset(p for is_lit, p in parts if not is_lit)
+
+    def render(self, values):
+        if not self.fields:
+            return self.source
+        return "".join(p if is_lit else str(values[p]) for is_lit, p in self.parts)
+
+
+def _header_value(text):
+    """Subject header value, RFC 2047-encoded when it is not plain ASCII."""
+    if text.isascii():
+        return text
+    return Header(text, "utf-8").encode()
+
+
+class MessageTemplate:
+    """Compiled subject + body with the static MIME headers prepared once."""
+
+    __slots__ = ("subject", "body", "_subject_header")
+
+    def __init__(self, subject, body):
+        self.subject = subject
+        self.body = body
+        # Static subjects are encoded once; subjects with placeholders per recipient
+        self._subject_header = None if subject.fields else _header_value(subject.source)
+
+    def build(self, from_addr, to_addr, values, extra_headers=()):
+        """Return the wire-format message for one recipient."""
+        subject = self._subject_header or _header_value(self.subject.render(values))
+        return build_raw(from_addr, to_addr, subject, self.body.render(values), extra_headers,
+                         subject_encoded=True)
+
+
+_ASCII_HEAD = ('Content-Type: text/plain; charset="us-ascii"\n'
+               "MIME-Version: 1.0\n"
+               "Content-Transfer-Encoding: 7bit\n")
+_UTF8_HEAD = ('Content-Type: text/plain; charset="utf-8"\n'
+              "MIME-Version: 1.0\n"
+              "Content-Transfer-Encoding: base64\n")
+
+
+def build_raw(from_addr, to_addr, subject, body, extra_headers=(), subject_encoded=False):
+    """Plain-text message equivalent to MIMEText(body) without building a Message object."""
+    if not subject_encoded:
+        subject = _header_value(subject)
+    if body.isascii():
+        head, payload = _ASCII_HEAD, body
+    else:
+        encoded = base64.encodebytes(body.encode("utf-8")).decode("ascii")
+        head, payload = _UTF8_HEAD, encoded
+    lines = [head, f"Subject: {subject}\nFrom: {from_addr}\nTo: {to_addr}\n"]
+    for key, value in extra_headers:
+        lines.append(f"{key}: {value}\n")
+    lines.append("\n")
+    lines.append(payload)
+    return "".join(lines)
+
+
+class TemplateEngine:
+    """Loads messages.json once, validates it and hands out compiled templates.
+
+    ``maybe_reload()`` re-reads the file when its mtime changes; a file that
+    fails validation is reported and the previous templates stay in use.
+    """
+
+    def __init__(self, path="messages.json"):
+        self.path = path
+        self.data = DEFAULT_MESSAGES
+        self.error = None
+        self._mtime = None
+        self._lock = threading.Lock()
+        self._compiled = self._compile(DEFAULT_MESSAGES)
+        self.reload()
+
+    # ---------------- loading ----------------
+
+    @staticmethod
+    def _compile(data):
+        """Validate the whole file and return {kind: [MessageTemplate, ...]}; raises TemplateError."""
+        if not isinstance(data, dict):
+            raise TemplateError("messages.json must contain a JSON object")
+        missing = [k for k in ("initial", "auto_replies", "follow_ups") if k not in data]
+        if missing:
+            raise TemplateError("messages.json must contain 'initial', 'auto_replies', and 'follow_ups'")
+        initial = data["initial"]
+        if not isinstance(initial, dict) or "subject" not in initial or "body" not in initial:
+            raise TemplateError("'initial' must have a 'subject' and a 'body'")
+
+        errors = []
+        compiled = {}
+
+        def compile_one(source, where):
+            try:
+                return CompiledTemplate(source, where)
+            except TemplateError as e:
+                errors.append(str(e))
+                return None
+
+        base_subject = initial["subject"]
+        for kind in ("initial", "auto_replies", "follow_ups"):
+            subject = compile_one(SUBJECT_PREFIX[kind] + str(base_subject), "initial.subject")
+            if subject and kind in FALLBACKS:
+                fallback = CompiledTemplate(FALLBACKS[kind], f"fallback {kind}")
+                compiled["fallback_" + kind] = MessageTemplate(subject, fallback)
+            if kind == "initial":
+                bodies = [initial["body"]]
+            elif isinstance(data[kind], list):
+                bodies = data[kind]
+            else:
+                errors.append(f"'{kind}' must be a list")
+                continue
+            templates = []
+            for i, body in enumerate(bodies):
+                where = "initial.body" if kind == "initial" else f"{kind}[{i}]"
+                body = compile_one(body, where)
+                if subject and body:
+                    templates.append(MessageTemplate(subject, body))
+            compiled[kind] = templates
+        if errors:
+            raise TemplateError("; ".join(errors))
+        return compiled
+
+    def reload(self):
+        """Load and validate the file now. Returns True if the new templates are in use."""
+        try:
+            mtime = os.path.getmtime(self.path)
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            compiled = self._compile(data)
+        except Exception as e:
+            self.error = str(e)
+            print(f"Error loading {self.path}: {e}")
+            try:
+                self._mtime = os.path.getmtime(self.path)  # don't retry until it changes again
+            except OSError:
+                pass
+            return False
+        with self._lock:
+            self.data = data
+            self._compiled = compiled
+            self._mtime = mtime
+            self.error = None
+        return True
+
+    def maybe_reload(self):
+        """Cheap mtime check; reloads only when the file changed."""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return False
+        if mtime == self._mtime:
+            return False
+        return self.reload()
+
+    # ---------------- rendering ----------------
+
+    def get(self, kind, step=0):
+        """Compiled template for ``kind`` (initial / auto_replies / follow_ups) and 0-based step."""
+        compiled = self._compiled
+        templates = compiled[kind]
+        if step < len(templates):
+            return templates[step]
+        return compiled["fallback_" + kind]
+
+    def subject(self, kind):
+        return SUBJECT_PREFIX[kind] + self.data["initial"]["subject"]
+
+    def build(self, kind, step, from_addr, to_addr, name, extra_headers=()):
+        values = {"name": name, "email": to_addr, "number": step + 1}
+        return self.get(kind, step).build(from_addr, to_addr, values, extra_headers)
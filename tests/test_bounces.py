@@ -0,0 +1,68 @@
+import bounces
+
+DSN = (
+    b"From: Mail Delivery Subsystem <mailer-daemon@googlemail.com>\r\n"
+    b"To: sender@example.com\r\n"
+    b"Subject: Delivery Status Notification (Failure)\r\n"
+    b"MIME-Version: 1.0\r\n"
+    b'Content-Type: multipart/report; report-type=delivery-status; boundary="b1"\r\n'
+    b"\r\n"
+    b"--b1\r\n"
+    b"Content-Type: text/plain; charset=utf-8\r\n"
+    b"\r\n"
+    b"Your message wasn't delivered.\r\n"
+    b"--b1\r\n"
+    b"Content-Type: message/delivery-status\r\n"
+    b"\r\n"
+    b"Reporting-MTA: dns; googlemail.com\r\n"
+    b"\r\n"
+    b"Final-Recipient: rfc822; gone@leads.test\r\n"
+    b"Action: failed\r\n"
+    b"Status: 5.1.1\r\n"
+    b"\r\n"
+    b"Final-Recipient: rfc822; <slow@leads.test>\r\n"
+    b"Action: delayed\r\n"
+    b"Status: 4.4.1\r\n"
+    b"\r\n"
+    b"--b1\r\n"
+    b"Content-Type: message/rfc822\r\n"
+    b"\r\n"
+    b"From: sender@example.com\r\n"
+    b"To: gone@leads.test\r\n"
+    b"Subject: Hello\r\n"
+    b"\r\n"
+    b"Hi there\r\n"
+    b"--b1--\r\n"
+)
+
+GMAIL_TEXT_BOUNCE = (
+    b"From: mailer-daemon@googlemail.com\r\n"
+    b"Subject: Delivery Status Notification (Failure)\r\n"
+    b"Content-Type: text/plain; charset=utf-8\r\n"
+    b"\r\n"
+    b"Your message wasn't delivered to nobody@leads.test because the address couldn't be found.\r\n"
+    b"550 5.1.1 The email account that you tried to reach does not exist.\r\n"
+)
+
+
+def test_parse_dsn_reports_failed_recipients_only():
+    assert bounces.parse_dsn(DSN) == [("gone@leads.test", "5.1.1")]
+
+
+def test_parse_dsn_falls_back_to_the_text():
+    assert bounces.parse_dsn(GMAIL_TEXT_BOUNCE) == [("nobody@leads.test", "5.1.1")]
+
+
+def test_parse_dsn_ignores_temporary_failures():
+    raw = GMAIL_TEXT_BOUNCE.replace(b"550 5.1.1", b"451 4.4.1")
+    assert bounces.parse_dsn(raw) == []
+
+
+def test_classify():
+    report = {"Content-Type": "multipart/report; report-type=delivery-status"}
+    assert bounces.classify("someone@leads.test", report) == bounces.BOUNCE
+    assert bounces.classify("MAILER-DAEMON@example.com", {"Subject": "Undelivered Mail"}) == bounces.BOUNCE
+    assert bounces.classify("lead@leads.test", {"Auto-Submitted": "auto-replied"}) == bounces.AUTO_RESPONSE
+    assert bounces.classify("lead@leads.test", {"Subject": "Out of Office: back Monday"}) == bounces.AUTO_RESPONSE
+    assert bounces.classify("lead@leads.test", {"Precedence": "bulk"}) == bounces.AUTO_RESPONSE
+    assert bounces.classify("lead@leads.test", {"Subject": "Re: Hello", "Auto-Submitted": "no"}) == bounces.REPLY
@@ -0,0 +1,105 @@
+import os
+import time
+from automation import GmailAutomation
+from fake_servers import FakeGmail
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def make_bot(fake, data_dir, leads):
+    bot = GmailAutomation(os.path.join(HERE, "messages.json"), str(data_dir), **fake.server_settings())
+    bot.account_per_minute = 10 ** 9
+    bot.account_per_day = 0
+    bot.followup_interval = 10 ** 6   # no follow-ups while the test runs
+    bot.add_account("sender@sender.test", "app-password")
+    bot.add_leads((f"Lead {i}", f"lead{i}@leads.test") for i in range(leads))
+    return bot
+
+
+def wait_for(condition, timeout=30):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def run_to_completion(bot, log=None):
+    """Start the campaign and wait until every initial email went through the pipeline."""
+    bot.start(log_callback=(lambda text: None) if log is None else log.append)
+    wait_for(lambda: bot._threads and not bot._threads[0].is_alive())
+
+
+def test_fake_gmail_round_trip(tmp_path):
+    fake = FakeGmail(reply_rate=1.0, seed=1).start()
+    bot = make_bot(fake, tmp_path, 20)
+    try:
+        run_to_completion(bot)
+        assert bot.pipeline.sent == 20
+        # Every lead replies; every reply gets an auto-reply
+        wait_for(lambda: fake.replies_sent == 20 and len(fake.latencies) == 20)
+        bot.stop()
+        assert fake.smtp.accepted == 40
+        assert bot.store.counts() == {"initial": 20, "reply": 20, "auto_reply": 20}
+    finally:
+        bot.close()
+        fake.close()
+
+
+def test_resume_does_not_resend(tmp_path):
+    fake = FakeGmail().start()
+    try:
+        bot = make_bot(fake, tmp_path, 20)
+        run_to_completion(bot)
+        bot.close()
+        assert fake.smtp.accepted == 20
+
+        # Same campaign after a restart, with five more leads
+        bot = make_bot(fake, tmp_path, 25)
+        log = []
+        run_to_completion(bot, log)
+        bot.close()
+        assert fake.smtp.accepted == 25
+        assert bot.pipeline.sent == 5
+        assert "📤 Initial emails finished: 5/5 processed (5 sent, 0 failed)" in log
+        assert bot.scheduler.next_due() is not None   # the old leads' follow-ups were re-armed
+    finally:
+        fake.close()
+
+
+def test_status_and_metrics_show_the_smtp_pool(tmp_path):
+    fake = FakeGmail().start()
+    bot = make_bot(fake, tmp_path, 5)
+    try:
+        run_to_completion(bot)
+        pool = bot.status()["smtp_pool"]
+        assert pool["connects"] >= 1 and pool["open"] >= 1
+        text = bot.metrics.render()
+        assert 'gmail_automation_smtp_sessions{state="open"}' in text
+        assert 'gmail_automation_smtp_pool_events{event="connects"}' in text
+    finally:
+        bot.close()
+        fake.close()
+
+
+def test_quick_stop_and_start_sends_every_lead_once(tmp_path):
+    fake = FakeGmail(latency=0.002).start()
+    bot = make_bot(fake, tmp_path, 150)
+    bot.leads_complete.clear()   # a lead file is still streaming in
+    try:
+        bot.start(log_callback=lambda text: None)
+        wait_for(lambda: bot.pipeline and bot.pipeline.submitted == 150)
+        time.sleep(0.05)   # the feeder is now waiting for more leads
+        old = bot.pipeline
+        bot.stop(timeout=0.01)
+        bot.start(log_callback=lambda text: None)
+        wait_for(lambda: bot.pipeline is not old)
+        # Wakes both the old feeder and the new one; only the new one may feed the new pipeline
+        bot.add_leads((f"Late {i}", f"late{i}@leads.test") for i in range(500))
+        bot.leads_complete.set()
+        wait_for(lambda: not bot._threads[0].is_alive(), timeout=15)
+        bot.stop()
+        assert fake.smtp.accepted == 650
+        assert bot.store.counts()["initial"] == 650
+    finally:
+        bot.close()
+        fake.close()
@@ -0,0 +1,57 @@
+import socket
+import threading
+import time
+import pytest
+from imap_watcher import IMAPWatcher, open_imap
+
+
+def silent_server():
+    """A server that greets like IMAP and then never answers (a half-open connection)."""
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen()
+    connections = []
+
+    def accept():
+        while True:
+            try:
+                conn, _ = listener.accept()
+            except OSError:
+                return
+            connections.append(conn)
+            conn.sendall(b"* OK IMAP4rev1 ready\r\n")
+
+    threading.Thread(target=accept, daemon=True).start()
+    return listener, connections
+
+
+def test_reads_time_out_on_a_stalled_connection():
+    listener, connections = silent_server()
+    try:
+        started = time.monotonic()
+        with pytest.raises(OSError):  # socket.timeout
+            open_imap("127.0.0.1", listener.getsockname()[1], use_ssl=False, timeout=0.5)
+        assert time.monotonic() - started < 5
+    finally:
+        listener.close()
+        for conn in connections:
+            conn.close()
+
+
+def test_watcher_gives_up_on_a_stalled_server():
+    listener, connections = silent_server()
+    stop = threading.Event()
+    watcher = IMAPWatcher("user", "pw", host="127.0.0.1", port=listener.getsockname()[1],
+                          use_ssl=False, stop_event=stop, timeout=0.5)
+    try:
+        # connection() keeps retrying with backoff; each attempt must fail fast instead of hanging
+        t = threading.Thread(target=lambda: watcher.wait(1), daemon=True)
+        t.start()
+        time.sleep(2)
+        stop.set()
+        t.join(5)
+        assert not t.is_alive()
+    finally:
+        listener.close()
+        for conn in connections:
+            conn.close()
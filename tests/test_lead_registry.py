@@ -0,0 +1,20 @@
+from lead_registry import LeadRegistry, normalize_email
+
+
+def test_normalize_email():
+    assert normalize_email("  MailTo:Jane.Doe@Example.COM ") == "jane.doe@example.com"
+    assert normalize_email(None) == ""
+
+
+def test_lookup_dedup_and_streaming():
+    registry = LeadRegistry([("Jane", "jane@leads.test"), ("Dup", "JANE@leads.test"), ("Blank", " ")])
+    assert len(registry) == 1 and registry.duplicates == 1
+    assert "Jane@Leads.Test" in registry
+    assert registry.get("mailto:jane@leads.test").name == "Jane"
+    assert registry.get("nobody@leads.test") is None
+
+    assert registry.load([("Bob", "bob@leads.test"), (None, "ann@leads.test")]) == 2
+    assert [lead.email for lead in registry.since(1)] == ["bob@leads.test", "ann@leads.test"]
+    assert registry.get("ann@leads.test").name == ""
+    name, email = registry.get("bob@leads.test")   # unpacks like the old tuples
+    assert (name, email) == ("Bob", "bob@leads.test")
@@ -0,0 +1,48 @@
+import json
+from reply_journal import ReplyJournal
+
+
+def test_query_filters_and_pages_across_segments(tmp_path):
+    journal = ReplyJournal(str(tmp_path), segment_size=200)
+    for i in range(10):
+        journal.append({"sender": f"lead{i % 2}@leads.test", "subject": f"Re {i}", "body": "x" * 50, "ts": 100 + i})
+    try:
+        assert len(list(tmp_path.glob("replies-*.jsonl"))) > 1
+        assert journal.count() == 10 and journal.count("lead0@leads.test") == 5
+        assert [e["subject"] for e in journal.query(limit=3)] == ["Re 9", "Re 8", "Re 7"]
+        assert [e["subject"] for e in journal.query(offset=3, limit=2, newest_first=False)] == ["Re 3", "Re 4"]
+        assert [e["subject"] for e in journal.query("lead1@leads.test", since=103, until=108)] == [
+            "Re 7", "Re 5", "Re 3"]
+    finally:
+        journal.close()
+
+
+def test_recovers_entries_missing_from_the_index(tmp_path):
+    journal = ReplyJournal(str(tmp_path))
+    journal.append({"sender": "a@leads.test", "subject": "first", "ts": 1})
+    journal.close()
+    # A crash between the data write and the index write
+    with open(tmp_path / "replies-000001.jsonl", "ab") as f:
+        f.write((json.dumps({"sender": "b@leads.test", "subject": "second", "ts": 2}) + "\n").encode())
+        f.write(b'{"sender": "c@leads.test", "subj')   # torn line
+    journal = ReplyJournal(str(tmp_path))
+    try:
+        assert [e["subject"] for e in journal.query(newest_first=False)] == ["first", "second"]
+        journal.close()
+        journal = ReplyJournal(str(tmp_path))   # recovery is idempotent
+        assert journal.count() == 2
+    finally:
+        journal.close()
+
+
+def test_import_json_runs_once(tmp_path):
+    old = tmp_path / "replies.json"
+    old.write_text(json.dumps([{"sender": "a@leads.test", "subject": "hi", "timestamp": "2024-01-02 03:04:05"}]))
+    journal = ReplyJournal(str(tmp_path / "replies"))
+    try:
+        assert journal.import_json(str(old)) == 1
+        assert journal.import_json(str(old)) == 0
+        entry, = journal.query()
+        assert entry["ts"] > 0
+    finally:
+        journal.close()
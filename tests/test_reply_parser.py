@@ -0,0 +1,51 @@
+import base64
+from reply_parser import ReplyParser, decode_part, parse_reply, strip_reply
+
+
+def test_strip_reply_drops_quoted_history_and_signature():
+    text = ("Sounds good, call me tomorrow.\r\n"
+            "\r\n"
+            "--\r\n"
+            "Jane\r\n"
+            "\r\n"
+            "On Mon, 3 Jun 2024 at 10:00, Sender <sender@example.com> wrote:\r\n"
+            "> Hello Jane\r\n")
+    assert strip_reply(text) == "Sounds good, call me tomorrow."
+
+
+def test_strip_reply_handles_wrapped_attribution_and_outlook():
+    wrapped = "Yes please.\n\nOn Mon, 3 Jun 2024 at 10:00, Sender\n<sender@example.com> wrote:\n> Hi"
+    assert strip_reply(wrapped) == "Yes please."
+    outlook = "Not now.\n\nFrom: Sender <sender@example.com>\nSent: Monday\nSubject: Hi"
+    assert strip_reply(outlook) == "Not now."
+    mobile = "Will do\n\nSent from my iPhone"
+    assert strip_reply(mobile) == "Will do"
+
+
+def test_strip_reply_keeps_inline_answers():
+    text = "> Are you free on Friday?\nYes, after 2pm.\n> Which office?\nThe Berlin one."
+    assert strip_reply(text) == "Yes, after 2pm.\nThe Berlin one."
+
+
+def test_decode_part():
+    body = "Grüße aus Köln".encode("utf-8")
+    assert decode_part(base64.b64encode(body), "utf-8", "base64") == "Grüße aus Köln"
+    assert decode_part(b"Gr=C3=BC=C3=9Fe", "utf-8", "quoted-printable") == "Grüße"
+    assert decode_part(b"plain", "no-such-charset", None) == "plain"
+    # A partial fetch can cut base64 mid-quantum
+    assert decode_part(base64.b64encode(b"abcdefgh")[:-3], "utf-8", "base64") == "abcdef"
+
+
+def test_parse_reply_truncates():
+    assert parse_reply((b"x" * 50, "utf-8", None, 10)) == "x" * 10 + "\n[…]"
+
+
+def test_process_pool_matches_inline_parsing():
+    parts = [(f"Reply {i}\n\nOn Mon, Sender wrote:\n> quoted".encode(), "utf-8", None) for i in range(20)]
+    parser = ReplyParser(workers=2, min_batch=8)
+    try:
+        assert parser.parse_many(parts) == [f"Reply {i}" for i in range(20)]
+        assert parser.workers == 2   # did not fall back to inline parsing
+        assert parser._pool._mp_context.get_start_method() != "fork"
+    finally:
+        parser.close()
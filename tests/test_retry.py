@@ -0,0 +1,54 @@
+import smtplib
+from clock import VirtualClock
+from retry import (TRANSIENT, RATE_LIMITED, SENDER_REJECTED, PERMANENT, RetryQueue, backoff_delay,
+                   classify_error)
+
+
+def test_classify_error():
+    assert classify_error(smtplib.SMTPResponseException(421, b"4.7.0 Try again later")) == RATE_LIMITED
+    assert classify_error(smtplib.SMTPSenderRefused(550, b"5.4.5 Daily user sending quota exceeded",
+                                                    "s@example.com")) == RATE_LIMITED
+    assert classify_error(smtplib.SMTPDataError(451, b"4.3.0 Temporary failure")) == TRANSIENT
+    assert classify_error(smtplib.SMTPDataError(552, b"5.2.2 Mailbox full")) == TRANSIENT
+    assert classify_error(smtplib.SMTPAuthenticationError(535, b"5.7.8 Bad credentials")) == TRANSIENT
+    assert classify_error(smtplib.SMTPServerDisconnected("Connection unexpectedly closed")) == TRANSIENT
+    assert classify_error(ConnectionResetError()) == TRANSIENT
+
+
+def test_account_and_message_errors_do_not_condemn_the_address():
+    assert classify_error(smtplib.SMTPSenderRefused(553, b"5.7.1 Sender address rejected",
+                                                    "alias@example.com")) == SENDER_REJECTED
+    assert classify_error(smtplib.SMTPDataError(
+        550, b"5.7.1 Our system has detected an unusual rate of unsolicited mail")) == SENDER_REJECTED
+    assert classify_error(smtplib.SMTPDataError(552, b"5.3.4 Message size exceeds fixed limit")) == TRANSIENT
+    policy = smtplib.SMTPRecipientsRefused({"a@leads.test": (550, b"5.7.1 Relaying denied")})
+    assert classify_error(policy) == SENDER_REJECTED
+
+
+def test_classify_refused_recipients():
+    refused = smtplib.SMTPRecipientsRefused({"gone@leads.test": (550, b"5.1.1 No such user")})
+    assert classify_error(refused) == PERMANENT
+    mixed = smtplib.SMTPRecipientsRefused({"a@leads.test": (550, b"5.1.1 No such user"),
+                                           "b@leads.test": (450, b"4.2.1 Try later")})
+    assert classify_error(mixed) == TRANSIENT
+    disabled = smtplib.SMTPRecipientsRefused({"old@leads.test": (550, b"5.2.1 The email account is disabled")})
+    assert classify_error(disabled) == PERMANENT
+
+
+def test_backoff_delay_stays_within_bounds():
+    for attempt in range(1, 20):
+        delay = backoff_delay(attempt, base=30, cap=3600)
+        assert 15 <= delay <= max(15, min(3600, 30 * 2 ** (attempt - 1)))
+
+
+def test_retry_queue():
+    clock = VirtualClock(start=1000)
+    queue = RetryQueue(max_attempts=2, base=10, cap=10, clock=clock)
+    assert queue.push("a", 1)
+    assert queue.push("b", 2)
+    assert not queue.push("c", 3)
+    assert len(queue) == 2
+    assert queue.pop_due(clock.time()) == []
+    assert 1005 <= queue.next_due() <= 1010
+    assert sorted(queue.pop_due(1010)) == [("a", 1), ("b", 2)]
+    assert queue.next_due() is None
@@ -0,0 +1,28 @@
+from scheduler import FollowUpScheduler
+
+
+def test_pop_due_in_order_and_reschedule_replaces():
+    scheduler = FollowUpScheduler()
+    scheduler.schedule("a", 30, 0)
+    scheduler.schedule("b", 10, 0)
+    scheduler.schedule("c", 20, 1)
+    scheduler.schedule("a", 5, 1)    # replaces a's entry at 30
+    assert len(scheduler) == 3
+    assert scheduler.next_due() == 5
+    assert scheduler.due_for("a") == 5
+    assert scheduler.pop_due(15) == [("a", 1), ("b", 0)]
+    assert scheduler.pop_due(100) == [("c", 1)]
+    assert scheduler.next_due() is None and len(scheduler) == 0
+
+
+def test_cancel_and_wakeups():
+    woken = []
+    scheduler = FollowUpScheduler(on_wake=lambda: woken.append(True))
+    scheduler.schedule("a", 10, 0)
+    scheduler.schedule("b", 20, 0)   # not the earliest: no wake-up
+    assert len(woken) == 1
+    scheduler.schedule("c", 5, 0)
+    assert len(woken) == 2
+    scheduler.cancel("c")
+    assert scheduler.next_due() == 10
+    assert scheduler.pop_due(100) == [("a", 0), ("b", 0)]
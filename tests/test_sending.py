@@ -0,0 +1,161 @@
+import os
+import smtplib
+import bounces
+from automation import GmailAutomation
+from clock import VirtualClock
+from retry import SENT
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class StubTransport:
+    """Stands in for SMTPPool: ``errors`` maps a sender to the exception its sends raise."""
+
+    def __init__(self, errors=None):
+        self.errors = dict(errors or {})
+        self.sent = []
+
+    def send(self, user, password, from_addr, to_addrs, raw):
+        error = self.errors.get(user)
+        if error is not None:
+            raise error
+        self.sent.append((user, to_addrs[0]))
+
+    def warm(self, user, password):
+        pass
+
+    def close_all(self):
+        pass
+
+
+def make_bot(tmp_path, accounts=("a@sender.test", "b@sender.test"), errors=None):
+    bot = GmailAutomation(os.path.join(HERE, "messages.json"), str(tmp_path), clock=VirtualClock(start=10 ** 6))
+    bot.smtp_pool = StubTransport(errors)
+    for user in accounts:
+        bot.add_account(user, "pw", per_minute=10 ** 6, per_day=10 ** 6)
+    return bot
+
+
+def test_sender_refused_fails_over_without_suppressing(tmp_path):
+    refused = smtplib.SMTPSenderRefused(553, b"5.7.1 Sender address rejected", "a@sender.test")
+    bot = make_bot(tmp_path, errors={"a@sender.test": refused})
+    try:
+        bot.add_leads((f"Lead {i}", f"lead{i}@leads.test") for i in range(10))
+        for lead in bot.registry.since(0):
+            assert bot.send_template(lead, "initial") == SENT
+        assert [user for user, _ in bot.smtp_pool.sent] == ["b@sender.test"] * 10
+        assert len(bot.suppressions) == 0
+        assert not bot.accounts.get("a@sender.test").healthy()
+    finally:
+        bot.close()
+
+
+def test_login_throttling_benches_instead_of_locking(tmp_path):
+    throttled = smtplib.SMTPAuthenticationError(454, b"4.7.0 Too many login attempts, please try again later")
+    bot = make_bot(tmp_path, accounts=("a@sender.test",), errors={"a@sender.test": throttled})
+    try:
+        bot.add_leads([("Lead", "lead@leads.test")])
+        lead = bot.registry.get("lead@leads.test")
+        assert not bot.send_initial(lead, lambda text: None)
+        account = bot.accounts.get("a@sender.test")
+        assert not account.locked and not account.healthy()
+        assert len(bot.retry_queue) == 1
+        bot.clock.advance_to(bot.clock.time() + 3600)
+        assert account.healthy()
+        bot.smtp_pool.errors.clear()
+        (job, attempt), = bot.retry_queue.pop_due(bot.clock.time())
+        assert bot.send_initial(lead, lambda text: None, attempt)
+    finally:
+        bot.close()
+
+
+def test_campaign_halts_when_every_account_is_locked(tmp_path):
+    rejected = smtplib.SMTPAuthenticationError(535, b"5.7.8 Username and Password not accepted")
+    bot = make_bot(tmp_path, errors={"a@sender.test": rejected, "b@sender.test": rejected})
+    log = []
+    try:
+        bot.add_leads([("Lead", "lead@leads.test")])
+        lead = bot.registry.get("lead@leads.test")
+        bot.running = True
+        assert not bot.send_initial(lead, log.append)
+        assert all(account.locked for account in bot.accounts)
+        (job, attempt), = bot.retry_queue.pop_due(bot.clock.time() + 10 ** 6)
+        assert not bot.send_initial(lead, log.append, attempt)
+        # No account can send until a new start(): the job is not requeued forever
+        assert len(bot.retry_queue) == 0
+        assert not bot.running
+        assert "locked" in log[-1]
+    finally:
+        bot.close()
+
+
+def test_daily_quota_survives_a_restart(tmp_path):
+    bot = make_bot(tmp_path, accounts=("a@sender.test",))
+    bot.add_leads((f"Lead {i}", f"lead{i}@leads.test") for i in range(3))
+    for lead in bot.registry.since(0):
+        assert bot.send_initial(lead, lambda text: None)
+    # A new password builds a new account object; it still knows what the mailbox sent today
+    assert bot.add_account("a@sender.test", "new-pw").rate_limiter.usage()["sent_24h"] == 3
+    bot.close()
+
+    bot = GmailAutomation(os.path.join(HERE, "messages.json"), str(tmp_path),
+                          clock=VirtualClock(start=10 ** 6 + 3600))
+    try:
+        assert bot.add_account("a@sender.test", "pw").rate_limiter.usage()["sent_24h"] == 3
+        assert bot.add_account("b@sender.test", "pw").rate_limiter.usage()["sent_24h"] == 0
+    finally:
+        bot.close()
+    bot = GmailAutomation(os.path.join(HERE, "messages.json"), str(tmp_path),
+                          clock=VirtualClock(start=10 ** 6 + 86400))
+    try:
+        assert bot.add_account("a@sender.test", "pw").rate_limiter.usage()["sent_24h"] == 0
+    finally:
+        bot.close()
+
+
+def test_resume_answers_a_reply_the_last_run_never_answered(tmp_path):
+    bot = make_bot(tmp_path, accounts=("a@sender.test",))
+    bot.add_leads([("Lead", "lead@leads.test")])
+    lead = bot.registry.get("lead@leads.test")
+    assert bot.send_initial(lead, lambda text: None)
+    # The reply is recorded, then the process dies before the loop answers it
+    bot.incoming([{"kind": bounces.REPLY, "lead": lead.email, "sender": lead.email, "subject": "Re: hi",
+                   "body": "Tell me more", "message_id": "", "in_reply_to": "", "references": []}])
+    bot.close()
+
+    for expected in (1, 0):
+        bot = make_bot(tmp_path, accounts=("a@sender.test",))
+        try:
+            bot.add_leads([("Lead", "lead@leads.test")])
+            assert bot.resume(bot.registry.since(0)) == []
+            bot.process_due(lambda text: None)
+            assert bot.smtp_pool.sent == [("a@sender.test", "lead@leads.test")] * expected
+        finally:
+            bot.close()
+
+
+def test_a_throttled_account_is_waited_for_not_failed(tmp_path):
+    bot = make_bot(tmp_path, accounts=("a@sender.test",))
+    try:
+        bot.add_leads([("Lead", "lead@leads.test")])
+        bot.accounts.get("a@sender.test").mark_throttled("421 4.7.0", base=600)
+        started = bot.clock.time()
+        assert bot.send_initial(bot.registry.get("lead@leads.test"), lambda text: None)
+        assert bot.clock.time() - started >= 600
+        assert len(bot.retry_queue) == 0
+    finally:
+        bot.close()
+
+
+def test_nothing_is_requeued_or_suppressed_while_stopping(tmp_path):
+    bot = make_bot(tmp_path, accounts=("a@sender.test",))
+    log = []
+    try:
+        bot.add_leads([("Lead", "lead@leads.test")])
+        bot.stop()
+        lead = bot.registry.get("lead@leads.test")
+        assert not bot.send_initial(lead, log.append)
+        assert bot.smtp_pool.sent == [] and len(bot.retry_queue) == 0
+        assert not lead.suppressed and log == []
+    finally:
+        bot.close()
@@ -0,0 +1,38 @@
+import smtplib
+import pytest
+from fake_servers import FakeSMTPServer
+from smtp_pool import SMTPPool
+
+RAW = "Subject: hi\r\nFrom: me@sender.test\r\nTo: lead@leads.test\r\n\r\nHello\r\n"
+
+
+def test_sessions_are_reused():
+    server = FakeSMTPServer().start()
+    pool = SMTPPool("127.0.0.1", server.port, use_ssl=False)
+    try:
+        for _ in range(5):
+            pool.send("me@sender.test", "pw", "me@sender.test", ["lead@leads.test"], RAW)
+        stats = pool.stats()
+        assert server.accepted == 5
+        assert stats["connects"] == 1 and stats["messages"] == 5
+        assert (stats["open"], stats["idle"], stats["in_use"]) == (1, 1, 0)
+    finally:
+        pool.close_all()
+        server.close()
+
+
+def test_a_session_closed_by_a_421_is_not_reused():
+    server = FakeSMTPServer(throttle_every=2).start()
+    pool = SMTPPool("127.0.0.1", server.port, use_ssl=False)
+    try:
+        pool.send("me@sender.test", "pw", "me@sender.test", ["lead@leads.test"], RAW)
+        with pytest.raises(smtplib.SMTPException):
+            pool.send("me@sender.test", "pw", "me@sender.test", ["lead@leads.test"], RAW)
+        # smtplib closed the session on the 421: it is gone, not waiting in the idle set
+        assert (pool.stats()["open"], pool.stats()["idle"]) == (0, 0)
+        pool.send("me@sender.test", "pw", "me@sender.test", ["lead@leads.test"], RAW)
+        assert pool.stats()["connects"] == 2 and pool.stats()["reconnects"] == 0
+        assert server.accepted == 2 and server.throttled == 1
+    finally:
+        pool.close_all()
+        server.close()
@@ -0,0 +1,47 @@
+from lead_registry import Lead
+from state_store import CampaignStore
+
+
+def lead(email, **fields):
+    result = Lead("", email)
+    for key, value in fields.items():
+        setattr(result, key, value)
+    return result
+
+
+def test_restore_and_due_before(tmp_path):
+    store = CampaignStore(str(tmp_path / "campaign.db"))
+    for i, due in enumerate([300, 100, None, 200]):
+        sent = lead(f"l{i}@leads.test", sent_at=10, last_sent=10, followup_count=1, account="a@sender.test")
+        store.record(sent, "initial", 0, 10)
+        store.set_next_due(sent.email, due)
+    assert store.due_before(250) == [("l1@leads.test", 100), ("l3@leads.test", 200)]
+    assert store.due_before(1000, limit=1) == [("l1@leads.test", 100)]
+    store.set_next_due("l1@leads.test", None)
+    assert store.due_before(250) == [("l3@leads.test", 200)]
+    store.close()
+
+    store = CampaignStore(str(tmp_path / "campaign.db"))
+    try:
+        fresh = [Lead("", f"l{i}@leads.test") for i in range(5)]
+        assert store.restore(fresh) == {"l0@leads.test": 300, "l3@leads.test": 200}
+        assert (fresh[0].sent_at, fresh[0].followup_count, fresh[0].account) == (10, 1, "a@sender.test")
+        assert fresh[4].sent_at is None
+    finally:
+        store.close()
+
+
+def test_unanswered_replies(tmp_path):
+    store = CampaignStore(str(tmp_path / "campaign.db"))
+    try:
+        a, b, c = lead("a@leads.test"), lead("b@leads.test"), lead("c@leads.test")
+        store.record(a, "reply", ts=10)
+        store.record(b, "reply", ts=10)
+        store.record(b, "auto_reply", 0, ts=11)
+        store.record(c, "reply", ts=10)
+        store.record(c, "auto_reply", 0, ts=11)
+        store.record(c, "reply", ts=12)
+        assert sorted(store.unanswered(["a@leads.test", "b@leads.test", "c@leads.test"])) == [
+            "a@leads.test", "c@leads.test"]
+    finally:
+        store.close()
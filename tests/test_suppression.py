@@ -0,0 +1,20 @@
+from suppression import SuppressionIndex
+
+
+def test_persists_across_restarts_and_survives_a_torn_write(tmp_path):
+    path = str(tmp_path / "suppressed.bin")
+    index = SuppressionIndex(path)
+    assert index.add("Gone@Leads.test")
+    assert not index.add("gone@leads.test")
+    assert index.add("bounced@leads.test")
+    index.close()
+    with open(path, "ab") as f:
+        f.write(b"\x01\x02\x03")   # a crash mid-record
+
+    index = SuppressionIndex(path)
+    try:
+        assert len(index) == 2
+        assert "mailto:GONE@leads.test" in index
+        assert "bounced@leads.test" in index and "alive@leads.test" not in index
+    finally:
+        index.close()
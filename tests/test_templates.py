@@ -0,0 +1,25 @@
+from email.mime.text import MIMEText
+from templates import build_raw
+
+
+def mime_text(from_addr, to_addr, subject, body, extra_headers=()):
+    msg = MIMEText(body)
+    msg["Subject"] = subject
+    msg["From"] = from_addr
+    msg["To"] = to_addr
+    for key, value in extra_headers:
+        msg[key] = value
+    return msg.as_string()
+
+
+def test_build_raw_matches_mimetext():
+    cases = [
+        ("Hello", "Hi Jane,\n\nquick question about your team.\n"),
+        ("Grüße aus Köln", "Hallo Jürgen,\n\nkurze Frage.\n"),
+        ("Re: " + "long subject " * 10, "x" * 500),
+        ("Hello", ""),
+    ]
+    headers = [("Message-ID", "<1@sender.test>"), ("In-Reply-To", "<9@leads.test>")]
+    for subject, body in cases:
+        assert build_raw("me@sender.test", "jane@leads.test", subject, body, headers) == \
+            mime_text("me@sender.test", "jane@leads.test", subject, body, headers)
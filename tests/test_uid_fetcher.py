@@ -0,0 +1,98 @@
+import bounces
+from uid_fetcher import IncrementalFetcher
+
+
+def dsn(recipient):
+    return (
+        "From: mailer-daemon@googlemail.com\r\n"
+        "Subject: Delivery Status Notification (Failure)\r\n"
+        'Content-Type: multipart/report; report-type=delivery-status; boundary="b"\r\n'
+        "\r\n"
+        "--b\r\n"
+        "Content-Type: message/delivery-status\r\n"
+        "\r\n"
+        "Reporting-MTA: dns; googlemail.com\r\n"
+        "\r\n"
+        f"Final-Recipient: rfc822; {recipient}\r\n"
+        "Action: failed\r\n"
+        "Status: 5.1.1\r\n"
+        "\r\n"
+        "--b--\r\n"
+    ).encode()
+
+
+class StubMailbox:
+    """Just enough of imaplib's ``uid()`` for the fetcher; ``fail_fetch`` makes FETCHes of that UID fail."""
+
+    def __init__(self, messages, fail_fetch=None):
+        self.messages = messages   # uid -> raw message
+        self.fail_fetch = fail_fetch
+        self.seen = set()
+
+    def uid(self, command, *args):
+        if command == "SEARCH":
+            return "OK", [" ".join(map(str, sorted(self.messages))).encode()]
+        if command == "STORE":
+            self.seen.update(map(int, args[0].split(",")))
+            return "OK", [None]
+        uids = list(map(int, args[0].split(",")))
+        if self.fail_fetch in uids:
+            return "NO", [None]
+        data = []
+        for uid in uids:
+            raw = self.messages[uid]
+            if "HEADER.FIELDS" in args[1]:
+                raw = raw.split(b"\r\n\r\n", 1)[0] + b"\r\n\r\n"
+            data.append((f"{uid} (UID {uid} BODY {{{len(raw)}}}".encode(), raw))
+            data.append(b")")
+        return "OK", data
+
+
+LEADS = {"lead@leads.test"}
+
+
+def match(sender, in_reply_to, references):
+    return sender if sender in LEADS else None
+
+
+def test_only_bounces_for_leads_are_returned_and_marked_seen(tmp_path):
+    fetcher = IncrementalFetcher(str(tmp_path / "state.json"))
+    mail = StubMailbox({1: dsn("lead@leads.test"), 2: dsn("friend@example.com")})
+    found = fetcher.fetch_new(mail, "me@sender.test", 1, match)
+    assert [(m["uid"], m["kind"], m["bounced"]) for m in found] == [
+        (1, bounces.BOUNCE, [("lead@leads.test", "5.1.1")])]
+    assert mail.seen == {1}
+
+
+def reply(sender):
+    return f"From: {sender}\r\nSubject: Re: hello\r\nContent-Type: text/plain\r\n\r\nSure\r\n".encode()
+
+
+def test_last_uid_only_advances_past_handled_batches(tmp_path):
+    state = str(tmp_path / "state.json")
+    messages = {uid: reply("lead@leads.test") for uid in range(1, 6)}
+    mail = StubMailbox(messages, fail_fetch=3)
+    found = IncrementalFetcher(state, batch_size=2).fetch_new(mail, "me@sender.test", 1, match)
+    assert [m["uid"] for m in found] == [1, 2]
+
+    # A restart retries from the batch that failed, and nothing before it
+    mail.fail_fetch = None
+    found = IncrementalFetcher(state, batch_size=2).fetch_new(mail, "me@sender.test", 1, match)
+    assert [m["uid"] for m in found] == [3, 4, 5]
+    assert IncrementalFetcher(state, batch_size=2).fetch_new(mail, "me@sender.test", 1, match) == []
+
+
+def test_a_broken_connection_keeps_the_batches_already_handled(tmp_path):
+    state = str(tmp_path / "state.json")
+
+    class Dropping(StubMailbox):
+        def uid(self, command, *args):
+            if command == "FETCH" and args[0].startswith("3"):
+                raise OSError("connection reset")
+            return super().uid(command, *args)
+
+    mail = Dropping({uid: reply("lead@leads.test") for uid in range(1, 5)})
+    fetcher = IncrementalFetcher(state, batch_size=2)
+    assert [m["uid"] for m in fetcher.fetch_new(mail, "me@sender.test", 1, match)] == [1, 2]
+    assert mail.seen == {1, 2}
+    assert fetcher._state["me@sender.test"] == {"uidvalidity": 1, "last_uid": 2}
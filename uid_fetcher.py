@@ -0,0 +1,266 @@
+import os
+import re
+import json
+import threading
+from email.parser import BytesHeaderParser
+from email.header import decode_header, make_header
+from email.utils import parseaddr
+import bounces
+from reply_parser import ReplyParser
+from metrics import Metrics
+
+_UID_RE = re.compile(rb"UID (\d+)")
+_TOKEN_RE = re.compile(rb'\(|\)|"(?:[^"\\]|\\.)*"|[^\s()"]+')
+
+
+def _parse_list(data):
+    """Parse an IMAP parenthesized list (e.g. a BODYSTRUCTURE) into nested lists."""
+    stack = [[]]
+    for tok in _TOKEN_RE.findall(data):
+        if tok == b"(":
+            stack.append([])
+        elif tok == b")":
+            if len(stack) > 1:
+                done = stack.pop()
+                stack[-1].append(done)
+        elif tok.startswith(b'"'):
+            stack[-1].append(tok[1:-1].replace(b'\\"', b'"').decode(errors="ignore"))
+        elif tok.upper() == b"NIL":
+            stack[-1].append(None)
+        else:
+            stack[-1].append(tok.decode(errors="ignore"))
+    return stack[0]
+
+
+def _find_text_plain(structure, prefix=""):
+    """Return (section, charset, encoding) of the first text/plain part."""
+    if structure and isinstance(structure[0], list):
+        # multipart: children come first, then the subtype string
+        for i, child in enumerate(structure):
+            if not isinstance(child, list):
+                break
+            found = _find_text_plain(child, f"{prefix}{i + 1}.")
+            if found:
+                return found
+        return None
+    if len(structure) < 6 or not isinstance(structure[0], str):
+        return None
+    if structure[0].lower() == "text" and str(structure[1]).lower() == "plain":
+        params = structure[2] or []
+        charset = "utf-8"
+        for key, value in zip(params[::2], params[1::2]):
+            if str(key).lower() == "charset" and value:
+                charset = value
+        return (prefix.rstrip(".") or "1", charset, (structure[5] or "7bit").lower())
+    return None
+
+
+def _decode_header(value):
+    if not value:
+        return ""
+    try:
+        return str(make_header(decode_header(value)))
+    except Exception:
+        return value
+
+
+def _literals(data):
+    """Yield (uid, literal bytes) from an imaplib FETCH response."""
+    for item in data:
+        if isinstance(item, tuple):
+            m = _UID_RE.search(item[0])
+            if m:
+                yield int(m.group(1)), item[1]
+
+
+class IncrementalFetcher:
+    """Fetch only mail that arrived since the last run, in batched UID sets.
+
+    The last seen UID per account is persisted together with the mailbox
+    UIDVALIDITY, so a restart picks up where it left off and a mailbox
+    rebuild on the server starts over. Only headers are fetched for every
+    message; the text/plain part is downloaded (with BODY.PEEK) only for
+    messages that ``match`` assigns to a lead, and only those are marked seen.
+    At most ``body_bytes`` of that part are downloaded; ``parser`` (a
+    ReplyParser) turns the raw parts into capped reply text in batches.
+    Bounces are kept whoever sent them: their first ``dsn_bytes`` are fetched
+    and the permanently failed recipients that are leads reported under
+    ``bounced``; bounces for anyone else are left unread.
+    Each IMAP round-trip is timed as a stage in ``metrics``.
+    """
+
+    HEADER_FIELDS = "FROM SUBJECT IN-REPLY-TO REFERENCES MESSAGE-ID " + bounces.HEADER_FIELDS
+
+    def __init__(self, state_file="imap_state.json", batch_size=200, dsn_bytes=128 * 1024,
+                 body_bytes=64 * 1024, parser=None, metrics=None):
+        self.state_file = state_file
+        self.batch_size = batch_size
+        self.dsn_bytes = dsn_bytes
+        self.body_bytes = body_bytes
+        self.parser = parser or ReplyParser(workers=0)
+        self.metrics = metrics or Metrics()
+        self._lock = threading.Lock()
+        self._state = self._load_state()
+
+    def _load_state(self):
+        if os.path.exists(self.state_file):
+            try:
+                with open(self.state_file, "r", encoding="utf-8") as f:
+                    return json.load(f)
+            except Exception:
+                pass
+        return {}
+
+    def _commit(self, account, uidvalidity, last_uid):
+        # Every mailbox shares the state file, so only this (not the IMAP traffic) is serialized
+        with self._lock:
+            self._state[account] = {"uidvalidity": uidvalidity, "last_uid": last_uid}
+            tmp = self.state_file + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._state, f)
+            os.replace(tmp, self.state_file)
+
+    def _new_uids(self, mail, account, uidvalidity):
+        with self._lock:
+            entry = self._state.get(account)
+        if not entry or entry.get("uidvalidity") != uidvalidity:
+            # First run (or mailbox rebuilt): start from what is still unread
+            status, data = mail.uid("SEARCH", None, "UNSEEN")
+            last_uid = 0
+        else:
+            last_uid = entry["last_uid"]
+            status, data = mail.uid("SEARCH", None, f"UID {last_uid + 1}:*")
+        if status != "OK" or not data or not data[0]:
+            return []
+        # "n:*" always matches the highest UID, even when it is below n
+        return sorted(u for u in map(int, data[0].split()) if u > last_uid)
+
+    def _batches(self, uids):
+        for i in range(0, len(uids), self.batch_size):
+            yield uids[i:i + self.batch_size]
+
+    def fetch_new(self, mail, account, uidvalidity, match):
+        """Return dicts for new lead mail and bounces: uid, kind, lead, sender, subject, body and threading headers.
+
+        ``match(sender, in_reply_to, references)`` returns the address of the
+        lead a message belongs to, or None to skip it. ``kind`` is
+        bounces.REPLY, AUTO_RESPONSE or BOUNCE; a bounce is only returned (and
+        marked \\Seen) when one of its failed recipients matches a lead.
+        """
+        with self.metrics.time("imap_search"):
+            uids = self._new_uids(mail, account, uidvalidity)
+        if not uids:
+            return []
+
+        results = []
+        parser = BytesHeaderParser()
+        try:
+            for batch in self._batches(uids):
+                uid_set = ",".join(map(str, batch))
+                with self.metrics.time("fetch_headers"):
+                    status, data = mail.uid("FETCH", uid_set,
+                                            f"(UID BODY.PEEK[HEADER.FIELDS ({self.HEADER_FIELDS})])")
+                if status != "OK":
+                    break  # retried from this batch on the next pass
+                matches = {}
+                for uid, raw in _literals(data):
+                    headers = parser.parsebytes(raw)
+                    sender = parseaddr(headers.get("From", ""))[1]
+                    kind = bounces.classify(sender, headers)
+                    in_reply_to = (headers.get("In-Reply-To") or "").strip()
+                    references = (headers.get("References") or "").split()
+                    lead = None
+                    if kind != bounces.BOUNCE:
+                        lead = match(sender, in_reply_to, references)
+                        if lead is None:
+                            continue
+                    matches[uid] = {
+                        "uid": uid,
+                        "kind": kind,
+                        "lead": lead,
+                        "sender": sender,
+                        "subject": _decode_header(headers.get("Subject", "")),
+                        "message_id": (headers.get("Message-ID") or "").strip(),
+                        "in_reply_to": in_reply_to,
+                        "references": references,
+                        "body": "",
+                    }
+
+                if matches:
+                    dsns = [uid for uid in matches if matches[uid]["kind"] == bounces.BOUNCE]
+                    replies = [uid for uid in matches if matches[uid]["kind"] != bounces.BOUNCE]
+                    if replies:
+                        self._fetch_bodies(mail, replies, matches)
+                    if dsns:
+                        with self.metrics.time("fetch_dsns"):
+                            self._fetch_dsns(mail, dsns, matches)
+                        for uid in dsns:
+                            # The user's own bounces are not ours to mark read
+                            bounced = []
+                            for recipient, status in matches[uid].get("bounced", ()):
+                                lead = match(recipient, "", [])
+                                if lead is not None:
+                                    bounced.append((lead, status))
+                            if bounced:
+                                matches[uid]["bounced"] = bounced
+                            else:
+                                del matches[uid]
+                    if matches:
+                        with self.metrics.time("imap_store"):
+                            mail.uid("STORE", ",".join(map(str, sorted(matches))), "+FLAGS", r"(\Seen)")
+
+                # The batch is fully handled: never fetch it again, even if a later one fails
+                self._commit(account, uidvalidity, batch[-1])
+                results.extend(matches[uid] for uid in sorted(matches))
+        except Exception as e:
+            if not results:
+                raise
+            # Hand over what was already committed; the broken connection fails the next pass
+            print(f"Fetching new mail for {account} stopped early: {e}")
+        return results
+
+    def _fetch_dsns(self, mail, batch, matches):
+        status, data = mail.uid("FETCH", ",".join(map(str, batch)),
+                                f"(UID BODY.PEEK[]<0.{self.dsn_bytes}>)")
+        if status != "OK":
+            return
+        for uid, raw in _literals(data):
+            if uid in matches:
+                matches[uid]["bounced"] = bounces.parse_dsn(raw)
+
+    def _fetch_bodies(self, mail, batch, matches):
+        with self.metrics.time("fetch_structure"):
+            status, data = mail.uid("FETCH", ",".join(map(str, batch)), "(UID BODYSTRUCTURE)")
+        if status != "OK":
+            return
+        sections = {}
+        for item in data:
+            if isinstance(item, tuple):
+                item = b" ".join(x for x in item if isinstance(x, bytes))
+            m = _UID_RE.search(item or b"")
+            if not m:
+                continue
+            idx = item.find(b"BODYSTRUCTURE")
+            if idx < 0:
+                continue
+            parsed = _parse_list(item[idx + len(b"BODYSTRUCTURE"):])
+            part = _find_text_plain(parsed[0]) if parsed else None
+            if part:
+                sections.setdefault(part, []).append(int(m.group(1)))
+
+        # One round-trip per distinct (section, charset, encoding); parse them all in one batch
+        fetched, parts = [], []
+        for (section, charset, encoding), uids in sections.items():
+            with self.metrics.time("fetch_bodies"):
+                status, data = mail.uid("FETCH", ",".join(map(str, uids)),
+                                        f"(UID BODY.PEEK[{section}]<0.{self.body_bytes}>)")
+            if status != "OK":
+                continue
+            for uid, raw in _literals(data):
+                if uid in matches:
+                    fetched.append(uid)
+                    parts.append((raw, charset, encoding))
+        with self.metrics.time("parse_bodies"):
+            texts = self.parser.parse_many(parts)
+        for uid, text in zip(fetched, texts):
+            matches[uid]["body"] = text